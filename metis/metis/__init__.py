@@ -7,6 +7,8 @@ from metis.exceptions import (
     MetisDataError,
     MetisConfigError,
     MetisTrainingError,
+    MetisTimeoutError,
+    MetisResourceError,
     MetisQuantumError,
 )
 from metis._api import fit, MetisModel, add, remove, list_models
@@ -21,6 +23,8 @@ __all__ = [
     "MetisDataError",
     "MetisConfigError",
     "MetisTrainingError",
+    "MetisTimeoutError",
+    "MetisResourceError",
     "MetisQuantumError",
     "__version__",
 ]
@@ -1,6 +1,7 @@
 """Main API for Metis package."""
 
 from typing import Union, Dict, Any, Optional
+import numpy as np
 import pandas as pd
 from sklearn.base import BaseEstimator
 
@@ -10,6 +11,10 @@ from metis.utils.data_loader import load_dataset, preprocess_dataset, split_data
 from metis.core.search_space import SearchSpace
 from metis.core.orchestrator import Orchestrator
 from metis.utils.feature_engineering import select_features
+from metis.core.leaderboard import Leaderboard
+from metis.core.ensemble import EnsembleModel
+from metis.core.warm_start import MetaIndex
+from metis.utils.meta_features import compute_meta_features
 from metis.models.registry import get_registry
 
 
@@ -18,13 +23,49 @@ class MetisModel:
     
     def __init__(self, model: BaseEstimator, hyperparameters: Dict[str, Any],
                  selected_features: list, metrics: Dict[str, float],
-                 metadata: Dict[str, Any]):
+                 metadata: Dict[str, Any], leaderboard: Optional[Leaderboard] = None):
         self.model = model
         self.hyperparameters = hyperparameters
         self.selected_features = selected_features
         self.metrics = metrics
         self.metadata = metadata
         self._is_classification = metadata.get('is_classification', False)
+        self._leaderboard = leaderboard
+    
+    def _select(self, X: pd.DataFrame) -> Any:
+        """Selected features in the layout the model was fitted on (numpy, or a DataFrame for ensembles)."""
+        X_selected = X[self.selected_features]
+        if isinstance(self.model, EnsembleModel):
+            return X_selected
+        return X_selected.to_numpy()
+    
+    def get_runner_up(self, rank: int) -> 'MetisModel':
+        """Get one of the top-k models kept during search without retraining it.
+        
+        Args:
+            rank: Leaderboard position (0 is the best model, 1 the runner-up, ...)
+        
+        Returns:
+            MetisModel wrapping the model at that rank
+        
+        Raises:
+            ValueError: If no leaderboard is available or the model was evicted
+            IndexError: If rank is out of range
+        """
+        if self._leaderboard is None:
+            raise ValueError("No leaderboard is available for this model")
+        
+        entry = self._leaderboard.summary()[rank]
+        return MetisModel(
+            model=self._leaderboard.get_model(rank),
+            hyperparameters=entry['hyperparameters'],
+            selected_features=[
+                name for name, selected in zip(self.metadata['feature_names'], entry['feature_mask'])
+                if selected
+            ],
+            metrics=entry['metrics'],
+            metadata={**self.metadata, 'model_name': entry['model'], 'rank': rank},
+        )
     
     def predict(self, X: pd.DataFrame) -> Any:
         """Make predictions on new data.
@@ -35,8 +76,7 @@ class MetisModel:
         Returns:
             Predictions array
         """
-        X_selected = X[self.selected_features]
-        return self.model.predict(X_selected)
+        return self.model.predict(self._select(X))
     
     def predict_proba(self, X: pd.DataFrame) -> Any:
         """Make probability predictions (classification only).
@@ -56,8 +96,7 @@ class MetisModel:
         if not hasattr(self.model, 'predict_proba'):
             raise ValueError("Model does not support predict_proba")
         
-        X_selected = X[self.selected_features]
-        return self.model.predict_proba(X_selected)
+        return self.model.predict_proba(self._select(X))
     
     def score(self, X: pd.DataFrame, y: pd.Series) -> float:
         """Score the model on test data.
@@ -69,8 +108,7 @@ class MetisModel:
         Returns:
             Score value
         """
-        X_selected = X[self.selected_features]
-        return self.model.score(X_selected, y)
+        return self.model.score(self._select(X), y)
     
     def __repr__(self) -> str:
         return f"MetisModel(model={self.metadata.get('model_name')}, metric={self.metadata.get('metric')}, score={self.metrics.get('validation_score', 0):.4f})"
@@ -90,7 +128,87 @@ def fit(dataset: Union[str, pd.DataFrame], config: Optional[Dict[str, Any]] = No
         search_budget (int): Number of optimization trials (default: 50)
         max_features (int): Maximum number of features to select (default: all)
         target_column (str): Target column name (auto-detected if not provided)
+        usecols (list): Columns to load from a dataset file, including the target (default: all)
+        sample_fraction (float): Fraction of a dataset file's rows to load, sampled at random
+            while the file is read (default: None, all rows)
+        optimize_dtypes (bool): Load dataset files with a compact schema inferred from their
+            first rows: float32 floats, the smallest integer types and category for
+            low-cardinality strings; CSV and JSON lines files are read in chunks (default: True)
         use_quantum (bool): Enable quantum sampling (default: True)
+        n_workers (int): Number of trials to run concurrently in a process pool,
+            or -1 for one per CPU (default: 1)
+        multi_fidelity (bool): Train candidates on growing stratified row subsets and
+            only promote the top 1/reduction_factor at each rung (default: False)
+        min_fidelity (float): Fraction of training rows used at the lowest rung (default: 0.1)
+        reduction_factor (int): Subset growth and promotion ratio between rungs (default: 3)
+        feature_selection (str): How the sampler encodes the feature subset. 'prefix' searches
+            the size of a prefix of the mutual-information ranking, 'mask' searches one boolean
+            per feature (default: 'prefix')
+        cache_dir (str): Directory for a persistent trial result cache shared across runs
+            and processes. Identical (data, features, model, hyperparameters) evaluations
+            are served from it instead of retraining (default: None, disabled)
+        cache_max_bytes (int): Size limit of the cache; least recently used entries are
+            evicted beyond it (default: 1 GiB)
+        checkpoint_path (str): Directory where the study, training history and best model are
+            saved after every trial. Rerunning with the same path resumes the search from the
+            last completed trial; a larger search_budget extends it (default: None)
+        time_budget_seconds (float): Wall-clock limit for the search. No new trials start
+            after it and running ones are killed (default: None)
+        trial_timeout_seconds (float): Per-trial limit; slower trials are killed, recorded as
+            'timeout' in the history and reported to the sampler as failures (default: None)
+        top_k (int): Number of best fitted models kept for get_runner_up() (default: 5)
+        leaderboard_max_bytes (int): Memory cap for the kept models; lower-ranked models
+            beyond it are spilled to spill_dir or dropped (default: 512 MiB)
+        spill_dir (str): Directory for models evicted from memory (default: None)
+        history_path (str): Directory where the full trial history is streamed as Parquet
+            files (requires pyarrow). Only the first 50 trials are kept in memory (default: None)
+        meta_index_path (str): SQLite file indexing past runs by dataset meta-features. The best
+            configs of the most similar past runs are tried first, and this run's top configs
+            are added to it when the search finishes (default: None, disabled)
+        warm_start_trials (int): Maximum number of configs taken from the meta index (default: 5)
+        ensemble_size (int): Rounds of greedy ensemble selection over the top_k models, using
+            their validation predictions from the search. The ensemble is returned if it beats
+            the best single model on the validation split (default: 0, disabled)
+        cost_aware (bool): Learn a runtime model from per-trial fit times and add a candidate
+            source that proposes the config with the best expected improvement per predicted
+            second. The budget allocator shifts trials to it when cheap configs pay off
+            (default: False)
+        coordinator_path (str): Directory on storage shared with worker machines. Trials are
+            queued there and evaluated by workers started with
+            ``python -m metis.worker <coordinator_path>`` instead of locally; n_workers is
+            ignored (default: None)
+        cv_folds (int): Score each trial by K-fold cross-validation on the training split
+            instead of the single validation split. Folds train in parallel, trials whose
+            first folds are clearly worse than the best so far stop early, and the fold
+            models are kept as an averaged ensemble, so nothing is refit (default: None)
+        train_scoring (str): When trials are scored on the training split. 'final' scores only
+            the returned model, 'subsample' also scores every trial on a fixed 1000-row sample,
+            'full' scores every trial on the whole split (default: 'final')
+        use_float32 (bool): Hold the training and validation matrices as float32 instead of
+            float64, halving their memory; models are then fitted on float32 features
+            (default: False)
+        path_trials (bool): Score every smaller n_estimators value of the search grid from
+            each random forest / XGBoost fit (prefixes of the trees or boosting rounds), and
+            every C of the grid from each warm-started logistic regression / Ridge sweep, and
+            record those points as extra trials, outside search_budget (default: False)
+        svm_max_rows (int): Above this many training rows, svm trials fit Nystroem kernel
+            features and a linear SVM instead of an exact SVC/SVR; history entries name the
+            approximation and the exact SVM is refit only if it wins. None always fits the
+            exact SVM (default: 50000)
+        n_cores (int): Cores shared by concurrent trials. Each of the n_workers trial
+            processes gets an equal share, passed to models as n_jobs and used to cap its
+            BLAS/OpenMP threads (default: all available CPUs)
+        pin_cpus (bool): Pin each trial process to its own CPUs (Linux only, default: False)
+        trial_memory_limit_bytes (int): Memory a trial may allocate on top of what its worker
+            process holds when the trial starts. Trials then run in worker processes that are
+            stopped when they exceed it (Linux only); the trial is
+            recorded as a 'resource_failure' and max_depth of that model is capped below
+            the value that failed for the rest of the search (default: None)
+        importance_repeats (int): Shuffles per feature when computing the permutation
+            importance of the final model on the validation split, scored in parallel
+            across n_cores threads; 0 skips it (default: 5)
+        importance_max_rows (int): Validation rows sampled for permutation importance;
+            None uses all of them (default: 10000)
     
     Returns:
         MetisModel: Trained model with metadata
@@ -125,7 +243,39 @@ def fit(dataset: Union[str, pd.DataFrame], config: Optional[Dict[str, Any]] = No
         'search_budget': 50,
         'max_features': None,
         'target_column': None,
+        'usecols': None,
+        'sample_fraction': None,
+        'optimize_dtypes': True,
         'use_quantum': True,
+        'n_workers': 1,
+        'multi_fidelity': False,
+        'min_fidelity': 0.1,
+        'reduction_factor': 3,
+        'feature_selection': 'prefix',
+        'cache_dir': None,
+        'cache_max_bytes': 1024 ** 3,
+        'checkpoint_path': None,
+        'time_budget_seconds': None,
+        'trial_timeout_seconds': None,
+        'top_k': 5,
+        'leaderboard_max_bytes': 512 * 1024 ** 2,
+        'spill_dir': None,
+        'history_path': None,
+        'meta_index_path': None,
+        'warm_start_trials': 5,
+        'ensemble_size': 0,
+        'cost_aware': False,
+        'coordinator_path': None,
+        'cv_folds': None,
+        'train_scoring': 'final',
+        'use_float32': False,
+        'path_trials': False,
+        'svm_max_rows': 50000,
+        'n_cores': None,
+        'pin_cpus': False,
+        'trial_memory_limit_bytes': None,
+        'importance_repeats': 5,
+        'importance_max_rows': 10000,
     }
     
     for key, value in default_config.items():
@@ -141,8 +291,72 @@ def fit(dataset: Union[str, pd.DataFrame], config: Optional[Dict[str, Any]] = No
     if not isinstance(config['search_budget'], int) or config['search_budget'] < 1:
         raise MetisConfigError(f"search_budget must be a positive integer, got {config['search_budget']}")
     
+    if not isinstance(config['n_workers'], int) or (config['n_workers'] < 1 and config['n_workers'] != -1):
+        raise MetisConfigError(f"n_workers must be a positive integer or -1, got {config['n_workers']}")
+    
+    if not isinstance(config['min_fidelity'], (int, float)) or not 0 < config['min_fidelity'] <= 1:
+        raise MetisConfigError(f"min_fidelity must be in (0, 1], got {config['min_fidelity']}")
+    
+    if not isinstance(config['reduction_factor'], int) or config['reduction_factor'] < 2:
+        raise MetisConfigError(f"reduction_factor must be an integer >= 2, got {config['reduction_factor']}")
+    
+    if config['feature_selection'] not in ['prefix', 'mask']:
+        raise MetisConfigError(f"Invalid feature_selection: {config['feature_selection']}. Must be 'prefix' or 'mask'")
+    
+    if not isinstance(config['cache_max_bytes'], int) or config['cache_max_bytes'] < 1:
+        raise MetisConfigError(f"cache_max_bytes must be a positive integer, got {config['cache_max_bytes']}")
+    
+    for key in ['time_budget_seconds', 'trial_timeout_seconds']:
+        if config[key] is not None and (not isinstance(config[key], (int, float)) or config[key] <= 0):
+            raise MetisConfigError(f"{key} must be a positive number, got {config[key]}")
+    
+    if config['usecols'] is not None and (
+            not isinstance(config['usecols'], (list, tuple)) or not all(isinstance(c, str) for c in config['usecols'])):
+        raise MetisConfigError(f"usecols must be a list of column names or None, got {config['usecols']}")
+    
+    if config['sample_fraction'] is not None and (
+            not isinstance(config['sample_fraction'], (int, float)) or not 0 < config['sample_fraction'] <= 1):
+        raise MetisConfigError(f"sample_fraction must be in (0, 1] or None, got {config['sample_fraction']}")
+    
+    for key in ['top_k', 'leaderboard_max_bytes', 'warm_start_trials']:
+        if not isinstance(config[key], int) or config[key] < 1:
+            raise MetisConfigError(f"{key} must be a positive integer, got {config[key]}")
+    
+    if config['train_scoring'] not in ['final', 'subsample', 'full']:
+        raise MetisConfigError(f"Invalid train_scoring: {config['train_scoring']}. Must be 'final', 'subsample' or 'full'")
+    
+    for key in ['use_float32', 'path_trials', 'pin_cpus', 'optimize_dtypes']:
+        if not isinstance(config[key], bool):
+            raise MetisConfigError(f"{key} must be a boolean, got {config[key]}")
+    
+    if config['svm_max_rows'] is not None and (not isinstance(config['svm_max_rows'], int) or config['svm_max_rows'] < 1):
+        raise MetisConfigError(f"svm_max_rows must be a positive integer or None, got {config['svm_max_rows']}")
+    
+    if config['trial_memory_limit_bytes'] is not None and (
+            not isinstance(config['trial_memory_limit_bytes'], int) or config['trial_memory_limit_bytes'] < 1):
+        raise MetisConfigError(f"trial_memory_limit_bytes must be a positive integer or None, got {config['trial_memory_limit_bytes']}")
+    
+    if not isinstance(config['importance_repeats'], int) or config['importance_repeats'] < 0:
+        raise MetisConfigError(f"importance_repeats must be a non-negative integer, got {config['importance_repeats']}")
+    
+    if config['importance_max_rows'] is not None and (
+            not isinstance(config['importance_max_rows'], int) or config['importance_max_rows'] < 1):
+        raise MetisConfigError(f"importance_max_rows must be a positive integer or None, got {config['importance_max_rows']}")
+    
+    if config['n_cores'] is not None and (not isinstance(config['n_cores'], int) or config['n_cores'] < 1):
+        raise MetisConfigError(f"n_cores must be a positive integer or None, got {config['n_cores']}")
+    
+    if config['cv_folds'] is not None and (not isinstance(config['cv_folds'], int) or config['cv_folds'] < 2):
+        raise MetisConfigError(f"cv_folds must be an integer >= 2, got {config['cv_folds']}")
+    
+    if not isinstance(config['ensemble_size'], int) or config['ensemble_size'] < 0:
+        raise MetisConfigError(f"ensemble_size must be a non-negative integer, got {config['ensemble_size']}")
+    
     try:
-        df = load_dataset(dataset)
+        df = load_dataset(
+            dataset, usecols=config['usecols'], sample_fraction=config['sample_fraction'],
+            optimize_dtypes=config['optimize_dtypes']
+        )
     except MetisDataError:
         raise
     except Exception as e:
@@ -173,7 +387,7 @@ def fit(dataset: Union[str, pd.DataFrame], config: Optional[Dict[str, Any]] = No
         max_features = X.shape[1]
     
     is_classification = y.dtype == 'object' or y.dtype.name == 'category' or \
-                       (y.dtype in ['int64', 'int32'] and y.nunique() < 20)
+                       (pd.api.types.is_integer_dtype(y.dtype) and y.nunique() < 20)
     
     search_space = SearchSpace(
         list(X.columns),
@@ -181,6 +395,17 @@ def fit(dataset: Union[str, pd.DataFrame], config: Optional[Dict[str, Any]] = No
         max_features=max_features
     )
     
+    meta_index = None
+    meta_features = None
+    warm_start_configs = []
+    if config['meta_index_path']:
+        meta_index = MetaIndex(config['meta_index_path'])
+        meta_features = compute_meta_features(X, y, is_classification)
+        warm_start_configs = meta_index.suggest(
+            meta_features, is_classification, config['metric'],
+            num_configs=config['warm_start_trials']
+        )
+    
     try:
         orchestrator = Orchestrator(
             X_train, X_val, X_test,
@@ -189,17 +414,59 @@ def fit(dataset: Union[str, pd.DataFrame], config: Optional[Dict[str, Any]] = No
             config['metric'],
             config['objective'],
             config['search_budget'],
-            use_quantum=config.get('use_quantum', True)
+            use_quantum=config.get('use_quantum', True),
+            n_workers=config['n_workers'],
+            multi_fidelity=config['multi_fidelity'],
+            min_fidelity=config['min_fidelity'],
+            reduction_factor=config['reduction_factor'],
+            feature_selection=config['feature_selection'],
+            cache_dir=config['cache_dir'],
+            cache_max_bytes=config['cache_max_bytes'],
+            checkpoint_path=config['checkpoint_path'],
+            time_budget_seconds=config['time_budget_seconds'],
+            trial_timeout_seconds=config['trial_timeout_seconds'],
+            top_k=config['top_k'],
+            leaderboard_max_bytes=config['leaderboard_max_bytes'],
+            spill_dir=config['spill_dir'],
+            history_path=config['history_path'],
+            warm_start_configs=warm_start_configs,
+            ensemble_size=config['ensemble_size'],
+            cost_aware=config['cost_aware'],
+            coordinator_path=config['coordinator_path'],
+            cv_folds=config['cv_folds'],
+            train_scoring=config['train_scoring'],
+            dtype=np.float32 if config['use_float32'] else None,
+            path_trials=config['path_trials'],
+            svm_max_rows=config['svm_max_rows'],
+            n_cores=config['n_cores'],
+            pin_cpus=config['pin_cpus'],
+            trial_memory_limit_bytes=config['trial_memory_limit_bytes'],
+            importance_repeats=config['importance_repeats'],
+            importance_max_rows=config['importance_max_rows']
         )
         
+        # The orchestrator holds the splits as numpy matrices; free the DataFrames before searching
+        feature_names = list(X.columns)
+        del df, X, X_train, X_val, X_test
+        
         results = orchestrator.run()
-    except MetisTrainingError:
+    except (MetisTrainingError, MetisConfigError):
         raise
     except Exception as e:
         raise MetisTrainingError(f"Training failed: {str(e)}") from e
     
+    if meta_index is not None:
+        meta_index.record(meta_features, is_classification, config['metric'], [
+            {
+                'model': entry['model'],
+                'hyperparameters': entry['hyperparameters'],
+                'feature_fraction': len(entry['selected_features']) / len(feature_names),
+            }
+            for entry in results['leaderboard']
+        ])
+    
     model = MetisModel(
-        model=orchestrator.best_model,
+        model=orchestrator.ensemble if orchestrator.ensemble is not None else orchestrator.best_model,
         hyperparameters=results['best_model']['hyperparameters'],
         selected_features=results['best_model']['selected_features'],
         metrics=results['metrics'],
@@ -210,7 +477,10 @@ def fit(dataset: Union[str, pd.DataFrame], config: Optional[Dict[str, Any]] = No
             'is_classification': is_classification,
             'feature_importance': results.get('feature_importance', {}),
             'training_history': results.get('training_history', []),
-        }
+            'leaderboard': results.get('leaderboard', []),
+            'feature_names': feature_names,
+        },
+        leaderboard=orchestrator.leaderboard
     )
     
     return model
@@ -0,0 +1,82 @@
+"""Bandit allocation of the trial budget across candidate sources."""
+
+import math
+from typing import Dict, Any, List
+
+
+class BudgetAllocator:
+    """Chooses which source proposes the next trial.
+
+    Each source (e.g. 'tpe', 'quantum', 'random') is credited with the score
+    improvement its trials brought over the incumbent and charged for the
+    seconds they took. The next trial goes to the source with the best
+    UCB1 bound on improvement per second, so the remaining budget shifts
+    toward whatever is currently paying off while weak sources still get
+    an occasional trial. Older observations are discounted by decay on
+    every update.
+    """
+
+    def __init__(self, sources: List[str], warmup_trials: int = 2,
+                 exploration: float = 1.0, decay: float = 0.95):
+        self.sources = list(sources)
+        self.warmup_trials = warmup_trials
+        self.exploration = exploration
+        self.decay = decay
+        self.stats = {
+            source: {'trials': 0, 'gain': 0.0, 'seconds': 0.0, 'weight': 0.0}
+            for source in self.sources
+        }
+
+    def record(self, source: str, improvement: float, seconds: float, trials: int = 1):
+        """Credit a source with the outcome of its trials.
+
+        Args:
+            source: Source that proposed the trials
+            improvement: Gain over the incumbent (0 if the incumbent did not change)
+            seconds: Wall-clock time spent, including candidate generation
+            trials: Number of trials this update covers (0 for pure overhead)
+        """
+        for stats in self.stats.values():
+            stats['gain'] *= self.decay
+            stats['seconds'] *= self.decay
+            stats['weight'] *= self.decay
+
+        stats = self.stats[source]
+        stats['trials'] += trials
+        stats['gain'] += max(0.0, improvement)
+        stats['seconds'] += max(seconds, 1e-6)
+        stats['weight'] += trials
+
+    def rate(self, source: str) -> float:
+        """Discounted improvement per second of a source."""
+        stats = self.stats[source]
+        if stats['seconds'] <= 0:
+            return 0.0
+        return stats['gain'] / stats['seconds']
+
+    def choose(self, available: List[str]) -> str:
+        """Pick the source for the next trial among the available ones."""
+        for source in self.sources:
+            if source in available and self.stats[source]['trials'] < self.warmup_trials:
+                return source
+
+        total = sum(self.stats[source]['weight'] for source in available)
+        scale = max((self.rate(source) for source in available), default=0.0)
+
+        def bound(source):
+            weight = max(self.stats[source]['weight'], 1e-6)
+            bonus = self.exploration * scale * math.sqrt(math.log(max(total, 1.0) + 1.0) / weight)
+            return self.rate(source) + bonus
+
+        # max() keeps the first of equal bounds, so ties go to the earliest source
+        return max((source for source in self.sources if source in available), key=bound)
+
+    def state(self) -> Dict[str, Any]:
+        """Serializable allocator state, for checkpoints."""
+        return {source: dict(stats) for source, stats in self.stats.items()}
+
+    def load_state(self, state: Dict[str, Any]):
+        """Restore state saved with state()."""
+        for source, stats in state.items():
+            if source in self.stats:
+                self.stats[source].update(stats)
@@ -0,0 +1,162 @@
+"""Persistent content-addressed cache of trial results."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def data_fingerprint(*frames) -> str:
+    """Hash the contents of DataFrames/Series (values, index and column names) or numpy arrays."""
+    digest = hashlib.sha256()
+    for frame in frames:
+        if isinstance(frame, np.ndarray):
+            digest.update(f'{frame.dtype}:{frame.shape}'.encode())
+            if frame.dtype == object:
+                frame = pd.Series(frame.ravel())
+            else:
+                digest.update(np.ascontiguousarray(frame).tobytes())
+                continue
+        elif isinstance(frame, pd.DataFrame):
+            digest.update(json.dumps([str(c) for c in frame.columns]).encode())
+            digest.update(json.dumps([str(t) for t in frame.dtypes]).encode())
+        else:
+            digest.update(str(frame.dtype).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _json_default(obj):
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return repr(obj)
+
+
+def config_key(fingerprint: str, config: Dict[str, Any], metric: str,
+               row_indices: Optional[np.ndarray] = None) -> str:
+    """Build the cache key for evaluating a configuration on a dataset."""
+    canonical = json.dumps({
+        'model': config['model'],
+        'hyperparameters': config['hyperparameters'],
+        'feature_mask': [bool(v) for v in config['feature_mask']],
+        'metric': metric,
+    }, sort_keys=True, default=_json_default)
+
+    digest = hashlib.sha256()
+    digest.update(fingerprint.encode())
+    digest.update(canonical.encode())
+    if row_indices is not None:
+        digest.update(np.ascontiguousarray(row_indices, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+class TrialCache:
+    """On-disk cache mapping configuration keys to (score, model, metrics).
+
+    Entries are joblib files written atomically; a SQLite index in WAL mode
+    tracks sizes and access times so several processes can share one cache
+    directory. The least recently used entries are evicted once the total
+    size exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not be shared across fork, so open one per process
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(
+                os.path.join(self.cache_dir, 'index.sqlite'),
+                timeout=60,
+                isolation_level=None,
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL)'
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.joblib')
+
+    def get(self, key: str) -> Optional[Tuple[float, Any, Dict[str, Any]]]:
+        """Return the cached result for key, or None on a miss."""
+        try:
+            conn = self._connection()
+            if conn.execute('SELECT 1 FROM entries WHERE key = ?', (key,)).fetchone() is None:
+                return None
+
+            try:
+                value = joblib.load(self._path(key))
+            except Exception:
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                return None
+
+            conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            return value
+        except sqlite3.Error as e:
+            logger.warning(f"Trial cache lookup failed: {e}")
+            return None
+
+    def put(self, key: str, value: Tuple[float, Any, Dict[str, Any]]):
+        """Store a result and evict old entries if the cache is over its size limit."""
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            joblib.dump(value, tmp_path)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, size, last_access) VALUES (?, ?, ?)',
+                (key, size, time.time())
+            )
+            self._evict()
+        except Exception as e:
+            logger.warning(f"Failed to write trial cache entry: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute('SELECT key, size FROM entries ORDER BY last_access').fetchall()
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    try:
+                        os.remove(self._path(key))
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
@@ -0,0 +1,72 @@
+"""On-disk checkpoints that let an interrupted search resume."""
+
+import os
+from typing import Dict, Any, Optional
+
+import joblib
+
+from metis.exceptions import MetisConfigError
+
+
+class Checkpoint:
+    """Persists search progress in a directory.
+
+    Layout:
+        study.db         Optuna study in SQLite storage
+        state.joblib     training history and stage progress
+        best.joblib      incumbent score, config, metrics and fitted model
+
+    Files are replaced atomically, so a crash never leaves a torn checkpoint.
+    """
+
+    STUDY_NAME = 'metis'
+
+    def __init__(self, path: str, run_key: str):
+        self.path = path
+        self.run_key = run_key
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def storage_url(self) -> str:
+        """SQLAlchemy URL of the Optuna study storage."""
+        return f"sqlite:///{os.path.abspath(os.path.join(self.path, 'study.db'))}"
+
+    def _state_path(self) -> str:
+        return os.path.join(self.path, 'state.joblib')
+
+    def _best_path(self) -> str:
+        return os.path.join(self.path, 'best.joblib')
+
+    def _atomic_dump(self, value: Any, path: str):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Load saved state, or None if nothing was saved yet.
+
+        The incumbent is returned under the 'best' key (None if no trial completed).
+
+        Raises:
+            MetisConfigError: If the checkpoint belongs to a different dataset or configuration
+        """
+        if not os.path.exists(self._state_path()):
+            return None
+
+        state = joblib.load(self._state_path())
+        if state.get('run_key') != self.run_key:
+            raise MetisConfigError(
+                f"Checkpoint at {self.path} was created for a different dataset or configuration. "
+                "Use a new checkpoint_path or delete the existing one."
+            )
+
+        state['best'] = None
+        if os.path.exists(self._best_path()):
+            state['best'] = joblib.load(self._best_path())
+        return state
+
+    def save(self, state: Dict[str, Any], best: Optional[Dict[str, Any]] = None):
+        """Persist state; the incumbent file is only rewritten when best is given."""
+        if best is not None:
+            self._atomic_dump(best, self._best_path())
+        self._atomic_dump({**state, 'run_key': self.run_key}, self._state_path())
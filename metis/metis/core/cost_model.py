@@ -0,0 +1,170 @@
+"""Runtime model and cost-aware candidate proposals."""
+
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from scipy.stats import norm
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from metis.core.search_space import SearchSpace
+
+
+class ConfigEncoder:
+    """Encodes configurations as fixed-length numeric vectors.
+
+    Every model gets an indicator column and one column per numeric
+    hyperparameter (log1p of the value, with None read as unbounded) plus
+    one indicator per non-numeric value. Two shared columns hold the log of
+    the number of selected features and of the fraction of training rows.
+    """
+
+    def __init__(self, search_space: SearchSpace):
+        self.search_space = search_space
+        self.columns: Dict[Tuple, int] = {}
+        self.model_columns: Dict[str, List[int]] = {}
+        self._unbounded: Dict[Tuple[str, str], float] = {}
+
+        for model_name, model_space in search_space.model_spaces.items():
+            indices = [self._add(('model', model_name))]
+            for param, values in model_space.items():
+                numeric = [v for v in values if v is not None and isinstance(v, (int, float))
+                           and not isinstance(v, bool)]
+                if numeric:
+                    indices.append(self._add((model_name, param)))
+                    self._unbounded[(model_name, param)] = math.log1p(2 * max(abs(v) for v in numeric))
+                for value in values:
+                    if value is not None and value not in numeric:
+                        indices.append(self._add((model_name, param, str(value))))
+            self.model_columns[model_name] = indices
+
+        self.shared_columns = [self._add(('num_features',)), self._add(('fraction',))]
+
+    def _add(self, key: Tuple) -> int:
+        self.columns[key] = len(self.columns)
+        return self.columns[key]
+
+    def encode(self, config: Dict[str, Any], fraction: float = 1.0) -> np.ndarray:
+        """Encode a configuration trained on a fraction of the training rows."""
+        vector = np.zeros(len(self.columns))
+        model_name = config['model']
+        vector[self.columns[('model', model_name)]] = 1.0
+
+        for param, value in config['hyperparameters'].items():
+            if value is None and (model_name, param) in self._unbounded:
+                vector[self.columns[(model_name, param)]] = self._unbounded[(model_name, param)]
+            elif isinstance(value, (int, float, np.number)) and not isinstance(value, bool) \
+                    and (model_name, param) in self.columns:
+                vector[self.columns[(model_name, param)]] = math.log1p(abs(float(value)))
+            elif (model_name, param, str(value)) in self.columns:
+                vector[self.columns[(model_name, param, str(value))]] = 1.0
+
+        vector[self.columns[('num_features',)]] = math.log(max(int(sum(config['feature_mask'])), 1))
+        vector[self.columns[('fraction',)]] = math.log(fraction)
+        return vector
+
+
+class RuntimeModel:
+    """Predicts fit time from configuration features.
+
+    One ridge regression per model family is fitted on log seconds once it
+    has min_observations samples; before that the family's (or, failing
+    that, every family's) mean log time is used.
+    """
+
+    def __init__(self, encoder: ConfigEncoder, min_observations: int = 3):
+        self.encoder = encoder
+        self.min_observations = min_observations
+        self._observations: Dict[str, List[Tuple[np.ndarray, float]]] = {}
+        self._models: Dict[str, Optional[Ridge]] = {}
+
+    def observe(self, config: Dict[str, Any], seconds: float, fraction: float = 1.0):
+        """Record the fit time of a configuration."""
+        vector = self.encoder.encode(config, fraction)
+        self._observations.setdefault(config['model'], []).append(
+            (vector, math.log(max(seconds, 1e-3)))
+        )
+        self._models.pop(config['model'], None)
+
+    def __len__(self) -> int:
+        return sum(len(observations) for observations in self._observations.values())
+
+    def _columns(self, model_name: str) -> List[int]:
+        return self.encoder.model_columns[model_name] + self.encoder.shared_columns
+
+    def _model(self, model_name: str) -> Optional[Ridge]:
+        if model_name not in self._models:
+            observations = self._observations.get(model_name, [])
+            model = None
+            if len(observations) >= self.min_observations:
+                X = np.array([vector for vector, _ in observations])[:, self._columns(model_name)]
+                y = np.array([log_seconds for _, log_seconds in observations])
+                model = Ridge(alpha=1.0).fit(X, y)
+            self._models[model_name] = model
+        return self._models[model_name]
+
+    def predict(self, config: Dict[str, Any], fraction: float = 1.0) -> float:
+        """Predicted fit time in seconds."""
+        model_name = config['model']
+        model = self._model(model_name)
+        if model is not None:
+            vector = self.encoder.encode(config, fraction)[self._columns(model_name)]
+            return float(np.exp(model.predict(vector.reshape(1, -1))[0]))
+
+        observations = self._observations.get(model_name) or \
+            [item for items in self._observations.values() for item in items]
+        if not observations:
+            return 1.0
+        return float(np.exp(np.mean([log_seconds for _, log_seconds in observations])))
+
+
+class CostAwareProposer:
+    """Proposes the candidate with the best expected improvement per predicted second.
+
+    Scores are modelled with a small random forest over encoded configs
+    (mean and spread across trees), fit times with a RuntimeModel. Each
+    proposal draws n_candidates random configs and returns the one that
+    maximizes EI / predicted_seconds ** cost_exponent.
+    """
+
+    def __init__(self, search_space: SearchSpace, runtime_model: RuntimeModel,
+                 maximize: bool = True, n_candidates: int = 256,
+                 cost_exponent: float = 1.0, min_observations: int = 5):
+        self.search_space = search_space
+        self.runtime_model = runtime_model
+        self.encoder = runtime_model.encoder
+        self.sign = 1.0 if maximize else -1.0
+        self.n_candidates = n_candidates
+        self.cost_exponent = cost_exponent
+        self.min_observations = min_observations
+        self._vectors: List[np.ndarray] = []
+        self._scores: List[float] = []
+
+    def observe(self, config: Dict[str, Any], score: float):
+        """Record the full-fidelity score of a configuration."""
+        if np.isfinite(score):
+            self._vectors.append(self.encoder.encode(config))
+            self._scores.append(self.sign * score)
+
+    def propose(self) -> Dict[str, Any]:
+        """Return the next candidate; a random one until enough scores are observed."""
+        candidates = [self.search_space.sample_random_config() for _ in range(self.n_candidates)]
+        if len(self._scores) < self.min_observations:
+            return candidates[0]
+
+        surrogate = RandomForestRegressor(n_estimators=50, min_samples_leaf=2, random_state=len(self._scores))
+        surrogate.fit(np.array(self._vectors), np.array(self._scores))
+
+        X = np.array([self.encoder.encode(candidate) for candidate in candidates])
+        per_tree = np.stack([tree.predict(X) for tree in surrogate.estimators_])
+        mean = per_tree.mean(axis=0)
+        std = np.maximum(per_tree.std(axis=0), 1e-9)
+
+        improvement = mean - max(self._scores)
+        z = improvement / std
+        expected_improvement = improvement * norm.cdf(z) + std * norm.pdf(z)
+
+        seconds = np.array([self.runtime_model.predict(candidate) for candidate in candidates])
+        utility = expected_improvement / np.power(np.maximum(seconds, 1e-3), self.cost_exponent)
+        return candidates[int(np.argmax(utility))]
@@ -0,0 +1,388 @@
+"""Distributed trial execution through a coordinator directory on shared storage."""
+
+import os
+import pickle
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, FIRST_COMPLETED
+from typing import Dict, Any, Optional, List, Iterable, Set, Tuple
+
+import joblib
+import numpy as np
+import logging
+
+from metis.core.trainer import ModelTrainer
+from metis.core.evaluator import Evaluator
+from metis.core.cache import TrialCache
+from metis.core.resources import ThreadBudget, limit_threads
+from metis.exceptions import MetisTrainingError, MetisTimeoutError
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 5.0
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Open the coordinator database, creating its tables on first use.
+
+    The default rollback journal is used rather than WAL, which needs shared
+    memory and does not work on network file systems.
+    """
+    conn = sqlite3.connect(os.path.join(path, 'coordinator.sqlite'), timeout=60, isolation_level=None)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS runs ('
+        'run_id TEXT PRIMARY KEY, data_path TEXT NOT NULL, status TEXT NOT NULL, created REAL NOT NULL)'
+    )
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS tasks ('
+        'task_id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT NOT NULL, payload BLOB NOT NULL, '
+        'status TEXT NOT NULL, worker TEXT, attempts INTEGER NOT NULL DEFAULT 0, heartbeat REAL)'
+    )
+    conn.execute('CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (run_id, status)')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS workers ('
+        'worker_id TEXT PRIMARY KEY, host TEXT NOT NULL, pid INTEGER NOT NULL, heartbeat REAL NOT NULL)'
+    )
+    return conn
+
+
+def _atomic_dump(value: Any, path: str):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    joblib.dump(value, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class DistributedPool:
+    """Trial pool whose workers are separate processes, possibly on other machines.
+
+    The coordinator (the process running metis.fit) and the workers share a
+    directory, e.g. on an NFS volume. The coordinator writes the training
+    and validation splits there once and queues trials in a SQLite database;
+    workers started with ``python -m metis.worker PATH`` claim trials, train
+    them with ModelTrainer and write the results back next to the database.
+
+    It has the same interface as TrialPool, so the orchestrator drives it
+    the same way. Time limits are enforced on the coordinator side: a trial
+    that runs too long is reported as timed out and its late result is
+    discarded. Trials of workers that stop sending heartbeats are requeued.
+    """
+
+    def __init__(self, path: str, X_train: np.ndarray, X_val: np.ndarray,
+                 y_train: np.ndarray, y_val: np.ndarray, is_classification: bool,
+                 metric: str, objective: str,
+                 row_subsets: Optional[List[Optional[np.ndarray]]] = None,
+                 cache: Optional[TrialCache] = None,
+                 trial_timeout: Optional[float] = None,
+                 deadline: Optional[float] = None,
+                 poll_interval: float = 0.2,
+                 lost_after: float = 60.0,
+                 max_attempts: int = 2,
+                 folds: Optional[List[Tuple[np.ndarray, np.ndarray]]] = None,
+                 fold_jobs: int = 1, train_scoring: str = 'final',
+                 feature_names: Optional[List[str]] = None,
+                 path_grids: Optional[Dict[str, List[Any]]] = None,
+                 svm_max_rows: Optional[int] = None):
+        self.path = path
+        self.trial_timeout = trial_timeout
+        self.deadline = deadline
+        self.poll_interval = poll_interval
+        self.lost_after = lost_after
+        self.max_attempts = max_attempts
+        self.run_id = uuid.uuid4().hex
+        self._run_dir = os.path.join(path, 'runs', self.run_id)
+        os.makedirs(os.path.join(self._run_dir, 'results'), exist_ok=True)
+
+        data_path = os.path.join(self._run_dir, 'data.joblib')
+        _atomic_dump({
+            'X_train': X_train,
+            'X_val': X_val,
+            'y_train': y_train,
+            'y_val': y_val,
+            'row_subsets': row_subsets or [],
+            'folds': folds,
+            'fold_jobs': fold_jobs,
+            'train_scoring': train_scoring,
+            'feature_names': feature_names,
+            'path_grids': path_grids,
+            'svm_max_rows': svm_max_rows,
+            'is_classification': is_classification,
+            'metric': metric,
+            'objective': objective,
+            'cache_dir': cache.cache_dir if cache is not None else None,
+            'cache_max_bytes': cache.max_bytes if cache is not None else None,
+        }, data_path)
+
+        self._conn = _connect(path)
+        self._conn.execute(
+            'INSERT INTO runs (run_id, data_path, status, created) VALUES (?, ?, ?, ?)',
+            (self.run_id, os.path.relpath(data_path, path), 'active', time.time())
+        )
+        # task_id -> (future, kill_at)
+        self._tasks: Dict[int, Tuple[Future, Optional[float]]] = {}
+        logger.info(f"Waiting for workers; start them with: python -m metis.worker {os.path.abspath(path)}")
+
+    @property
+    def n_workers(self) -> int:
+        """Number of workers that sent a heartbeat recently (at least 1)."""
+        alive = self._conn.execute(
+            'SELECT COUNT(*) FROM workers WHERE heartbeat >= ?', (time.time() - self.lost_after,)
+        ).fetchone()[0]
+        return max(alive, 1)
+
+    def submit(self, config: Dict[str, Any], rung: Optional[int] = None,
+               incumbent: Optional[float] = None) -> Future:
+        """Queue a configuration for a worker to evaluate.
+
+        Returns:
+            Future resolved by wait(); raises MetisTimeoutError if the trial
+            exceeds trial_timeout or the pool deadline
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        cursor = self._conn.execute(
+            'INSERT INTO tasks (run_id, payload, status) VALUES (?, ?, ?)',
+            (self.run_id, pickle.dumps((config, rung, incumbent), protocol=pickle.HIGHEST_PROTOCOL), 'pending')
+        )
+
+        limits = []
+        if self.trial_timeout:
+            limits.append(time.monotonic() + self.trial_timeout)
+        if self.deadline is not None:
+            limits.append(self.deadline)
+        self._tasks[cursor.lastrowid] = (future, min(limits) if limits else None)
+        return future
+
+    def _result_path(self, task_id: int) -> str:
+        return os.path.join(self._run_dir, 'results', f'{task_id}.joblib')
+
+    def _requeue_lost(self):
+        """Put trials of workers that stopped sending heartbeats back in the queue."""
+        stale = time.time() - self.lost_after
+        self._conn.execute(
+            "UPDATE tasks SET status = 'pending', worker = NULL "
+            "WHERE run_id = ? AND status = 'running' AND heartbeat < ? AND attempts < ?",
+            (self.run_id, stale, self.max_attempts)
+        )
+        self._conn.execute(
+            "UPDATE tasks SET status = 'lost' "
+            "WHERE run_id = ? AND status = 'running' AND heartbeat < ?",
+            (self.run_id, stale)
+        )
+
+    def _poll(self):
+        """Resolve futures of finished, lost and overdue trials."""
+        self._requeue_lost()
+        ids = list(self._tasks)
+        rows = self._conn.execute(
+            f"SELECT task_id, status FROM tasks WHERE task_id IN ({','.join('?' * len(ids))}) "
+            "AND status IN ('done', 'failed', 'lost')",
+            ids
+        ).fetchall()
+
+        for task_id, status in rows:
+            future, _ = self._tasks.pop(task_id)
+            if status == 'lost':
+                future.set_exception(MetisTrainingError(
+                    f"Trial was lost by its worker {self.max_attempts} times"
+                ))
+                continue
+            try:
+                payload = joblib.load(self._result_path(task_id))
+                os.remove(self._result_path(task_id))
+            except Exception as e:
+                future.set_exception(MetisTrainingError(f"Failed to read trial result: {e}"))
+                continue
+            if status == 'done':
+                future.set_result(payload)
+            else:
+                future.set_exception(payload)
+
+        now = time.monotonic()
+        for task_id, (future, kill_at) in list(self._tasks.items()):
+            if kill_at is not None and now >= kill_at:
+                del self._tasks[task_id]
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'cancelled' WHERE task_id = ?", (task_id,)
+                )
+                future.set_exception(MetisTimeoutError("Trial exceeded its time limit"))
+
+    def wait(self, futures: Iterable[Future], return_when: str = FIRST_COMPLETED) -> Tuple[Set[Future], Set[Future]]:
+        """Poll the coordinator database until some or all of the given futures are done.
+
+        Returns:
+            Tuple of (done, not_done) sets, like concurrent.futures.wait
+        """
+        futures = set(futures)
+        while True:
+            done = {future for future in futures if future.done()}
+            if (return_when == FIRST_COMPLETED and done) or len(done) == len(futures):
+                return done, futures - done
+            self._poll()
+            if not any(future.done() for future in futures - done):
+                time.sleep(self.poll_interval)
+
+    def shutdown(self):
+        """Cancel unfinished trials, close the run and remove its shared files."""
+        for future, _ in self._tasks.values():
+            future.cancel()
+        self._tasks.clear()
+        try:
+            self._conn.execute(
+                "UPDATE tasks SET status = 'cancelled' WHERE run_id = ? AND status IN ('pending', 'running')",
+                (self.run_id,)
+            )
+            self._conn.execute("UPDATE runs SET status = 'finished' WHERE run_id = ?", (self.run_id,))
+        finally:
+            self._conn.close()
+        shutil.rmtree(self._run_dir, ignore_errors=True)
+
+    def __enter__(self) -> 'DistributedPool':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+
+def _claim_task(conn: sqlite3.Connection, worker_id: str) -> Optional[Tuple[int, str, bytes]]:
+    """Atomically take the oldest pending trial of any active run."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute(
+            "SELECT t.task_id, t.run_id, t.payload FROM tasks t JOIN runs r ON r.run_id = t.run_id "
+            "WHERE t.status = 'pending' AND r.status = 'active' ORDER BY t.task_id LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE tasks SET status = 'running', worker = ?, attempts = attempts + 1, heartbeat = ? "
+                "WHERE task_id = ?",
+                (worker_id, time.time(), row[0])
+            )
+        conn.execute('COMMIT')
+        return row
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def _heartbeat_loop(path: str, worker_id: str, current: Dict[str, Any], stop: threading.Event):
+    """Refresh the worker's and its current trial's heartbeat until stopped."""
+    conn = _connect(path)
+    try:
+        while not stop.is_set():
+            now = time.time()
+            try:
+                conn.execute('UPDATE workers SET heartbeat = ? WHERE worker_id = ?', (now, worker_id))
+                if current.get('task_id') is not None:
+                    conn.execute(
+                        "UPDATE tasks SET heartbeat = ? WHERE task_id = ? AND status = 'running'",
+                        (now, current['task_id'])
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Worker heartbeat failed: {e}")
+            stop.wait(HEARTBEAT_SECONDS)
+    finally:
+        conn.close()
+
+
+def _load_evaluator(path: str, data_path: str,
+                    n_threads: Optional[int] = None) -> Tuple[Evaluator, List[Optional[np.ndarray]]]:
+    """Open a run's shared data and build the evaluator for it."""
+    data = joblib.load(os.path.join(path, data_path), mmap_mode='r')
+    trainer = ModelTrainer(
+        data['X_train'], data['X_val'],
+        data['y_train'], data['y_val'],
+        data['is_classification'],
+        folds=data['folds'],
+        fold_jobs=data['fold_jobs'],
+        train_scoring=data['train_scoring'],
+        feature_names=data['feature_names'],
+        path_grids=data['path_grids'],
+        svm_max_rows=data['svm_max_rows'],
+        n_jobs=n_threads
+    )
+    cache = None
+    if data['cache_dir']:
+        cache = TrialCache(data['cache_dir'], data['cache_max_bytes'])
+    return Evaluator(trainer, data['metric'], data['objective'], cache), data['row_subsets']
+
+
+def run_worker(path: str, poll_interval: float = 1.0, max_idle_seconds: Optional[float] = None,
+               n_threads: Optional[int] = None, pin_cpus: bool = False):
+    """Evaluate trials queued in a coordinator directory until stopped.
+
+    Models registered with metis.add on the coordinator must also be
+    registered in the worker process before calling this.
+
+    Args:
+        path: Coordinator directory passed to metis.fit as coordinator_path
+        poll_interval: Seconds between checks for new trials when idle
+        max_idle_seconds: Exit after this long without work (default: run forever)
+        n_threads: Threads per trial, for models and BLAS/OpenMP (default: every
+            CPU this process may use)
+        pin_cpus: Pin the worker to its first n_threads CPUs (Linux only)
+    """
+    budget = ThreadBudget(n_threads, 1, pin_cpus)
+    n_threads = budget.threads(0)
+    limit_threads(n_threads, budget.cpus(0))
+    os.makedirs(path, exist_ok=True)
+    worker_id = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+    conn = _connect(path)
+    conn.execute(
+        'INSERT OR REPLACE INTO workers (worker_id, host, pid, heartbeat) VALUES (?, ?, ?, ?)',
+        (worker_id, socket.gethostname(), os.getpid(), time.time())
+    )
+
+    current: Dict[str, Any] = {'task_id': None}
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(path, worker_id, current, stop), daemon=True)
+    heartbeat.start()
+
+    loaded_run = None
+    evaluator, row_subsets = None, []
+    idle_since = time.monotonic()
+    logger.info(f"Worker {worker_id} polling {os.path.abspath(path)}")
+    try:
+        while True:
+            claimed = _claim_task(conn, worker_id)
+            if claimed is None:
+                if max_idle_seconds is not None and time.monotonic() - idle_since >= max_idle_seconds:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            task_id, run_id, payload = claimed
+            current['task_id'] = task_id
+            result_path = os.path.join(path, 'runs', run_id, 'results', f'{task_id}.joblib')
+            try:
+                if run_id != loaded_run:
+                    data_path = conn.execute('SELECT data_path FROM runs WHERE run_id = ?', (run_id,)).fetchone()[0]
+                    evaluator, row_subsets = _load_evaluator(path, data_path, n_threads)
+                    loaded_run = run_id
+
+                config, rung, incumbent = pickle.loads(payload)
+                row_indices = row_subsets[rung] if rung is not None else None
+                try:
+                    outcome = ('done', evaluator.evaluate_config(config, row_indices, incumbent))
+                except Exception as e:
+                    outcome = ('failed', e if isinstance(e, MetisTrainingError) else MetisTrainingError(str(e)))
+
+                _atomic_dump(outcome[1], result_path)
+                conn.execute(
+                    "UPDATE tasks SET status = ? WHERE task_id = ? AND status = 'running' AND worker = ?",
+                    (outcome[0], task_id, worker_id)
+                )
+            except FileNotFoundError:
+                # The coordinator finished the run and removed its files meanwhile
+                loaded_run = None
+            finally:
+                current['task_id'] = None
+                idle_since = time.monotonic()
+    finally:
+        stop.set()
+        heartbeat.join()
+        conn.execute('DELETE FROM workers WHERE worker_id = ?', (worker_id,))
+        conn.close()
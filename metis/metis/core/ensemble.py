@@ -0,0 +1,110 @@
+"""Greedy ensemble selection over cached validation predictions."""
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator
+
+from metis.core.scoring import predict_split, compute_metrics, task_metrics
+
+
+def prediction_matrix(model: BaseEstimator, X: pd.DataFrame, is_classification: bool,
+                      classes: Optional[np.ndarray] = None) -> np.ndarray:
+    """Predictions of a fitted model in the float32 layout used for ensembling.
+
+    Classifiers give an (n_rows, n_classes) matrix of probabilities with
+    columns in the order of classes; models without predict_proba give
+    one-hot rows. Regressors give an (n_rows,) vector.
+    """
+    return predict_split(model, X, is_classification, classes)[1]
+
+
+def score_predictions(y: pd.Series, predictions: np.ndarray, metric: str,
+                      is_classification: bool, classes: Optional[np.ndarray] = None) -> float:
+    """Score a prediction matrix with the same conventions as ModelTrainer."""
+    if is_classification:
+        y_pred = classes[np.argmax(predictions, axis=1)]
+    else:
+        y_pred = predictions.astype(np.float64)
+    default = 'accuracy' if is_classification else 'r2'
+    metric = metric if metric in task_metrics(is_classification) else default
+    return compute_metrics(y, y_pred, predictions, [metric], is_classification, classes)[metric]
+
+
+def greedy_ensemble_selection(predictions: List[np.ndarray], y: pd.Series, metric: str,
+                              is_classification: bool, classes: Optional[np.ndarray] = None,
+                              ensemble_size: int = 20) -> np.ndarray:
+    """Caruana-style forward selection with replacement.
+
+    Each step adds the member whose inclusion gives the best score of the
+    averaged predictions; the step with the best score overall is kept.
+    Scores come from score_predictions, where higher is always better.
+
+    Returns:
+        Weights per member (summing to 1, zero for unused members)
+    """
+    counts = np.zeros(len(predictions), dtype=np.int64)
+    running = np.zeros(predictions[0].shape, dtype=np.float64)
+    best_score = float('-inf')
+    best_counts = None
+
+    for step in range(1, ensemble_size + 1):
+        scores = [
+            score_predictions(y, (running + member) / step, metric, is_classification, classes)
+            for member in predictions
+        ]
+        chosen = int(np.argmax(scores))
+        counts[chosen] += 1
+        running += predictions[chosen]
+        if scores[chosen] > best_score:
+            best_score = scores[chosen]
+            best_counts = counts.copy()
+
+    return best_counts / best_counts.sum()
+
+
+class EnsembleModel:
+    """Weighted average of fitted models, each using its own feature subset.
+
+    Members are used as they were fitted during search, never retrained.
+    DataFrames are reduced to each member's columns; numpy arrays are
+    assumed to hold the members' (shared) columns already.
+    """
+
+    def __init__(self, members: List[BaseEstimator], weights: List[float],
+                 feature_columns: List[List[str]], is_classification: bool,
+                 classes: Optional[np.ndarray] = None):
+        self.members = members
+        self.weights = list(weights)
+        self.feature_columns = feature_columns
+        self.is_classification = is_classification
+        self.classes_ = classes
+
+    def _average(self, X: pd.DataFrame) -> np.ndarray:
+        total = None
+        for member, weight, columns in zip(self.members, self.weights, self.feature_columns):
+            X_member = X[columns].to_numpy() if isinstance(X, pd.DataFrame) else X
+            predictions = prediction_matrix(member, X_member, self.is_classification, self.classes_)
+            total = weight * predictions if total is None else total + weight * predictions
+        return total
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        averaged = self._average(X)
+        if self.is_classification:
+            return self.classes_[np.argmax(averaged, axis=1)]
+        return averaged
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        if not self.is_classification:
+            raise ValueError("predict_proba is only available for classification models")
+        return self._average(X)
+
+    def score(self, X: pd.DataFrame, y: pd.Series) -> float:
+        """Accuracy for classification, R^2 for regression, like sklearn estimators."""
+        metric = 'accuracy' if self.is_classification else 'r2'
+        return compute_metrics(y, self.predict(X), None, [metric], self.is_classification, self.classes_)[metric]
+
+    def __repr__(self) -> str:
+        members = ', '.join(f'{type(m).__name__}:{w:.2f}' for m, w in zip(self.members, self.weights))
+        return f"EnsembleModel({members})"
@@ -1,28 +1,76 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import numpy as np
 import pandas as pd
 from metis.core.trainer import ModelTrainer
+from metis.core.cache import TrialCache, data_fingerprint, config_key
 
 
 class Evaluator:
     """Handles model evaluation and scoring."""
     
-    def __init__(self, trainer: ModelTrainer, metric: str, objective: str):
+    def __init__(self, trainer: ModelTrainer, metric: str, objective: str,
+                 cache: Optional[TrialCache] = None):
         self.trainer = trainer
         self.metric = metric
         self.objective = objective
+        self.cache = cache
+        self._fingerprint = None
     
-    def evaluate_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
-        """Evaluate a candidate configuration."""
-        score, model, metrics = self.trainer.train_and_evaluate(config, self.metric)
+    def _cache_key(self, config: Dict[str, Any], row_indices: Optional[np.ndarray]) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = data_fingerprint(
+                self.trainer.X_train, self.trainer.y_train,
+                self.trainer.X_val, self.trainer.y_val,
+                pd.Series([self.trainer.is_classification, len(self.trainer.folds or [])]),
+                pd.Series([str(name) for name in self.trainer.feature_names]),
+                pd.Series([repr(sorted(self.trainer.path_grids.items())), str(self.trainer.svm_max_rows)]),
+                pd.Series([self.trainer.train_scoring, str(self.trainer.train_sample_size)])
+            )
+        return config_key(self._fingerprint, config, self.metric, row_indices)
+    
+    def evaluate_config(self, config: Dict[str, Any],
+                        row_indices: Optional[np.ndarray] = None,
+                        incumbent: Optional[float] = None, exact: bool = False) -> Dict[str, Any]:
+        """Evaluate a candidate configuration, optionally on a subset of training rows.
+        
+        incumbent is the best trainer score so far, used to abort cross-validation
+        early; aborted evaluations are not cached. exact fits the exact model where
+        the trainer would approximate it (see ModelTrainer.svm_max_rows); such
+        one-off refits bypass the cache.
+        """
+        cached = None
+        use_cache = self.cache is not None and not exact
+        if use_cache:
+            key = self._cache_key(config, row_indices)
+            cached = self.cache.get(key)
+        
+        if cached is not None:
+            score, model, metrics = cached
+        else:
+            score, model, metrics = self.trainer.train_and_evaluate(
+                config, self.metric, row_indices, incumbent, exact
+            )
+            if use_cache and not metrics.get('cv_aborted'):
+                self.cache.put(key, (score, model, metrics))
         
-        if self.objective == 'minimize':
-            score = -score
+        sign = -1 if self.objective == 'minimize' else 1
+        # Extra points scored from the same fit (see ModelTrainer.path_grids)
+        path = [
+            {
+                'score': sign * point['score'],
+                'model': point['model'],
+                'metrics': point['metrics'],
+                'config': {**config, 'hyperparameters': point['hyperparameters']},
+            }
+            for point in metrics.pop('path', [])
+        ]
         
         return {
-            'score': score,
+            'score': sign * score,
             'model': model,
             'metrics': metrics,
             'config': config,
+            'path': path,
         }
     
     def compare_configs(self, configs: List[Dict[str, Any]]) -> Dict[str, Any]:
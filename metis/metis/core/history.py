@@ -0,0 +1,114 @@
+"""Bounded-memory trial history with optional streaming to Parquet."""
+
+import json
+import os
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = ['iteration', 'trial', 'status', 'source', 'score', 'fidelity',
+                   'model', 'hyperparameters', 'feature_mask', 'extra']
+
+
+def _to_row(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a history entry into one row of fixed columns."""
+    config = entry.get('config', {})
+    known = {'iteration', 'trial', 'status', 'source', 'score', 'fidelity', 'config'}
+    extra = {key: value for key, value in entry.items() if key not in known}
+    return {
+        'iteration': entry['iteration'],
+        'trial': entry.get('trial'),
+        'status': entry.get('status'),
+        'source': entry.get('source'),
+        'score': entry.get('score'),
+        'fidelity': entry.get('fidelity', 1.0),
+        'model': config.get('model'),
+        'hyperparameters': json.dumps(config.get('hyperparameters', {}), sort_keys=True, default=str),
+        'feature_mask': ''.join('1' if selected else '0' for selected in config.get('feature_mask', [])),
+        'extra': json.dumps(extra, sort_keys=True, default=str) if extra else None,
+    }
+
+
+def read_history(path: str) -> pd.DataFrame:
+    """Read a trial history written with history_path into a DataFrame."""
+    parts = sorted(name for name in os.listdir(path) if name.endswith('.parquet'))
+    if not parts:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    return pd.concat(
+        [pd.read_parquet(os.path.join(path, name)) for name in parts],
+        ignore_index=True
+    )
+
+
+class TrialHistory:
+    """Append-only record of finished trials.
+
+    Only the first keep entries are held in memory (that is what results
+    report); with a path, every entry is also buffered and written as
+    numbered Parquet part files of flush_every rows, so the whole history
+    can be read back with read_history() or pd.read_parquet(path) without
+    the search keeping it all in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None, keep: int = 50, flush_every: int = 100):
+        self.path = path
+        self.keep = keep
+        self.flush_every = flush_every
+        self.head: List[Dict[str, Any]] = []
+        self.count = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._part = 0
+
+        if path is not None:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                logger.warning("pyarrow is not installed; trial history will not be written to disk. "
+                               "Install it with: pip install pyarrow")
+                self.path = None
+            else:
+                os.makedirs(path, exist_ok=True)
+                self._part = len([name for name in os.listdir(path) if name.endswith('.parquet')])
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, entry: Dict[str, Any]):
+        """Record a finished trial."""
+        self.count += 1
+        if len(self.head) < self.keep:
+            self.head.append(entry)
+        if self.path is not None:
+            self._buffer.append(_to_row(entry))
+            if len(self._buffer) >= self.flush_every:
+                self.flush()
+
+    def flush(self):
+        """Write buffered rows as a new part file."""
+        if self.path is None or not self._buffer:
+            return
+        frame = pd.DataFrame(self._buffer, columns=HISTORY_COLUMNS)
+        frame['trial'] = frame['trial'].astype('Int64')
+        frame['score'] = frame['score'].astype('float64')
+        frame['fidelity'] = frame['fidelity'].astype('float64')
+
+        part_path = os.path.join(self.path, f'part-{self._part:05d}.parquet')
+        tmp_path = f'{part_path}.tmp'
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, part_path)
+        self._part += 1
+        self._buffer = []
+
+    def state(self) -> Dict[str, Any]:
+        """Serializable state, including rows not yet flushed, for checkpoints."""
+        return {'head': self.head, 'count': self.count, 'buffer': self._buffer}
+
+    def load_state(self, state: Dict[str, Any]):
+        """Restore state saved with state()."""
+        self.head = state['head']
+        self.count = state['count']
+        if self.path is not None:
+            self._buffer = state.get('buffer', [])
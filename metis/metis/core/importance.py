@@ -0,0 +1,60 @@
+"""Permutation feature importance of the final model."""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def permutation_importance(score: Callable[[object], float], X, y: np.ndarray,
+                           feature_names: List[str], n_repeats: int = 5,
+                           n_jobs: int = 1, max_rows: Optional[int] = None,
+                           random_state: int = 42) -> Dict[str, float]:
+    """Mean drop in score when each feature's column is shuffled.
+
+    Every (feature, repeat) pair is scored on its own copy of X in a thread
+    pool of n_jobs threads; model inference releases the GIL for the
+    models used here, so the threads run in parallel. Splits with more
+    than max_rows rows are subsampled first.
+
+    Args:
+        score: Called as score(X, y) with a permuted copy of X; higher is better
+        X: Split the model is scored on (numpy array or DataFrame) with
+            columns in the order of feature_names
+        y: Targets of X
+        feature_names: Names of the columns of X
+        n_repeats: Shuffles per feature
+        n_jobs: Threads scoring permutations concurrently
+        max_rows: Rows to subsample to, or None to use all of them
+        random_state: Seed of the row subsample and the shuffles
+
+    Returns:
+        Importance per feature name
+    """
+    rng = np.random.default_rng(random_state)
+    y = np.asarray(y)
+    if max_rows is not None and len(y) > max_rows:
+        rows = np.sort(rng.choice(len(y), max_rows, replace=False))
+        X = X.iloc[rows] if isinstance(X, pd.DataFrame) else X[rows]
+        y = y[rows]
+
+    baseline = score(X, y)
+    tasks = [(column, rng.permutation(len(y))) for column in range(len(feature_names))
+             for _ in range(n_repeats)]
+
+    def permuted_score(task) -> float:
+        column, order = task
+        if isinstance(X, pd.DataFrame):
+            X_permuted = X.copy()
+            X_permuted.iloc[:, column] = X.iloc[order, column].to_numpy()
+        else:
+            X_permuted = np.array(X)
+            X_permuted[:, column] = X[order, column]
+        return score(X_permuted, y)
+
+    with ThreadPoolExecutor(max_workers=max(1, n_jobs)) as executor:
+        scores = np.array(list(executor.map(permuted_score, tasks))).reshape(len(feature_names), n_repeats)
+
+    drops = baseline - scores
+    return {name: float(drop) for name, drop in zip(feature_names, drops.mean(axis=1))}
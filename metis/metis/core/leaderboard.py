@@ -0,0 +1,223 @@
+"""Top-k leaderboard of fitted models with a memory cap."""
+
+import json
+import os
+import pickle
+import sys
+from typing import Dict, Any, List, Optional
+
+import joblib
+import numpy as np
+import xgboost as xgb
+from sklearn.tree._tree import NODE_DTYPE, Tree
+import logging
+
+logger = logging.getLogger(__name__)
+
+# In-memory bytes of one XGBoost tree node (node plus its split statistics)
+XGB_NODE_BYTES = 40
+
+
+def _booster_size(booster: xgb.Booster) -> int:
+    """Upper bound on a booster's size from its tree count and depth.
+
+    Reads only the small training config; falls back to serializing the
+    booster when the trees have no depth limit.
+    """
+    config = json.loads(booster.save_config())['learner']['gradient_booster']
+    if 'gbtree_model_param' not in config:
+        return len(booster.save_raw())
+    n_trees = int(config['gbtree_model_param']['num_trees'])
+    tree_param = config['tree_train_param']
+    max_depth, max_leaves = int(tree_param['max_depth']), int(tree_param['max_leaves'])
+    if max_leaves > 0:
+        n_nodes = 2 * max_leaves - 1
+    elif max_depth > 0:
+        n_nodes = 2 ** (max_depth + 1) - 1
+    else:
+        return len(booster.save_raw())
+    return n_trees * n_nodes * XGB_NODE_BYTES
+
+
+def estimate_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """Approximate bytes held by a fitted model without serializing it.
+
+    Sums the numpy arrays, sklearn trees and XGBoost boosters reachable
+    from the model's attributes, including nested estimators such as the
+    trees of a forest or the members of an ensemble.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, Tree):
+        return obj.node_count * NODE_DTYPE.itemsize + obj.value.nbytes
+    if isinstance(obj, xgb.Booster):
+        return _booster_size(obj)
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(estimate_size(item, _seen) for item in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(value, _seen) for value in obj.values())
+    if hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj) + estimate_size(vars(obj), _seen)
+    return sys.getsizeof(obj)
+
+
+class Leaderboard:
+    """Keeps the k best fitted models found during search.
+
+    Model sizes are estimated from their arrays and trees (see estimate_size);
+    only once the estimates exceed max_bytes are the models pickled to
+    measure them exactly. When the models held
+    in memory exceed max_bytes, the lowest-ranked ones are spilled to
+    spill_dir with joblib, or dropped if no spill_dir is set. The best model
+    always stays in memory. Validation predictions, when given, are small
+    float32 arrays and always stay in memory for ensemble selection.
+    """
+
+    def __init__(self, k: int = 5, max_bytes: int = 512 * 1024 ** 2,
+                 maximize: bool = True, spill_dir: Optional[str] = None):
+        self.k = k
+        self.max_bytes = max_bytes
+        self.maximize = maximize
+        self.spill_dir = spill_dir
+        self.entries: List[Dict[str, Any]] = []
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _better(self, score: float, other: float) -> bool:
+        return score > other if self.maximize else score < other
+
+    def qualifies(self, score: float) -> bool:
+        """Whether a score would enter the leaderboard."""
+        return len(self.entries) < self.k or self._better(score, self.entries[-1]['score'])
+
+    def add(self, score: float, config: Dict[str, Any], metrics: Dict[str, Any],
+            model: Any, trial_number: Optional[int] = None,
+            predictions: Optional[np.ndarray] = None) -> bool:
+        """Insert a fitted model if it ranks in the top k.
+
+        Returns:
+            True if the model entered the leaderboard
+        """
+        if not self.qualifies(score):
+            return False
+
+        entry = {
+            'score': score,
+            'config': config,
+            'metrics': metrics,
+            'trial': trial_number,
+            'model': model,
+            'size': self._size(model),
+            'measured': False,
+            'path': None,
+            'predictions': predictions,
+        }
+        position = len(self.entries)
+        for i, other in enumerate(self.entries):
+            if self._better(score, other['score']):
+                position = i
+                break
+        self.entries.insert(position, entry)
+
+        while len(self.entries) > self.k:
+            self._discard(self.entries.pop())
+        self._enforce_memory_cap()
+        return True
+
+    @staticmethod
+    def _size(model: Any) -> int:
+        try:
+            return estimate_size(model)
+        except Exception:
+            return Leaderboard._pickled_size(model)
+
+    @staticmethod
+    def _pickled_size(model: Any) -> int:
+        try:
+            return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return 0
+
+    def replace(self, rank: int, score: float, metrics: Dict[str, Any], model: Any,
+                predictions: Optional[np.ndarray] = None):
+        """Swap the model at rank for a refit of the same config (e.g. an exact SVM).
+
+        The entry keeps its rank, so get_model(rank) returns the refit model.
+        """
+        entry = self.entries[rank]
+        self._discard(entry)
+        entry.update({
+            'score': score,
+            'metrics': metrics,
+            'model': model,
+            'size': self._size(model),
+            'measured': False,
+            'path': None,
+            'predictions': predictions,
+        })
+        self._enforce_memory_cap()
+
+    def _discard(self, entry: Dict[str, Any]):
+        if entry['path'] and os.path.exists(entry['path']):
+            os.remove(entry['path'])
+
+    def _enforce_memory_cap(self):
+        in_memory = sum(entry['size'] for entry in self.entries if entry['model'] is not None)
+        if in_memory > self.max_bytes:
+            for entry in self.entries:
+                if entry['model'] is not None and not entry['measured']:
+                    entry['size'] = self._pickled_size(entry['model'])
+                    entry['measured'] = True
+            in_memory = sum(entry['size'] for entry in self.entries if entry['model'] is not None)
+        for index in range(len(self.entries) - 1, 0, -1):
+            if in_memory <= self.max_bytes:
+                break
+            entry = self.entries[index]
+            if entry['model'] is None:
+                continue
+
+            if self.spill_dir:
+                path = os.path.join(self.spill_dir, f"model-{entry['trial']}-{id(entry)}.joblib")
+                try:
+                    joblib.dump(entry['model'], path)
+                    entry['path'] = path
+                except Exception as e:
+                    logger.warning(f"Failed to spill model to disk: {e}")
+            entry['model'] = None
+            in_memory -= entry['size']
+
+    def get_model(self, rank: int) -> Any:
+        """Return the fitted model at rank (0 is the best).
+
+        Raises:
+            IndexError: If there is no entry at rank
+            ValueError: If the model was evicted without being spilled to disk
+        """
+        entry = self.entries[rank]
+        if entry['model'] is not None:
+            return entry['model']
+        if entry['path'] is not None:
+            return joblib.load(entry['path'])
+        raise ValueError(f"Model at rank {rank} was evicted to stay under the memory cap; set spill_dir to keep it")
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Rank, score and configuration of every entry, without the models."""
+        return [
+            {
+                'rank': rank,
+                'trial': entry['trial'],
+                'model': entry['config']['model'],
+                'score': entry['score'],
+                'metrics': {k: v for k, v in entry['metrics'].items() if k != 'feature_importance'},
+                'hyperparameters': entry['config']['hyperparameters'],
+                'feature_mask': entry['config']['feature_mask'],
+                'in_memory': entry['model'] is not None,
+            }
+            for rank, entry in enumerate(self.entries)
+        ]
@@ -1,17 +1,44 @@
 import optuna
-from typing import Dict, Any, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 import pandas as pd
 import numpy as np
 from metis.core.search_space import SearchSpace
-from metis.core.trainer import ModelTrainer
+from metis.core.trainer import ModelTrainer, PATH_PARAMS, to_matrix
 from metis.core.evaluator import Evaluator
+from metis.core.parallel import TrialPool, resolve_n_workers
+from metis.core.distributed import DistributedPool
+from metis.core.cache import TrialCache, data_fingerprint
+from metis.core.resources import ThreadBudget, memory_limit_supported, single_threaded
+from metis.core.importance import permutation_importance
+from threadpoolctl import threadpool_limits
+from metis.utils.data_loader import fidelity_subsets, cv_fold_indices
+from metis.utils.feature_engineering import rank_features
 from metis.quantum.qaoa_sampler import QAOASampler
-from metis.exceptions import MetisTrainingError, MetisQuantumError
+from metis.core.checkpoint import Checkpoint
+from metis.core.allocator import BudgetAllocator
+from metis.core.history import TrialHistory
+from metis.core.leaderboard import Leaderboard
+from metis.core.ensemble import EnsembleModel, greedy_ensemble_selection, score_predictions
+from metis.core.cost_model import ConfigEncoder, RuntimeModel, CostAwareProposer
+from metis.exceptions import (
+    MetisTrainingError, MetisQuantumError, MetisConfigError, MetisTimeoutError, MetisResourceError
+)
+import hashlib
+import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 
+# Hyperparameter capped for a model after one of its trials runs out of memory
+MEMORY_CAPPED_PARAMS = {
+    'random_forest': 'max_depth',
+    'xgboost': 'max_depth',
+}
+
 def convert_to_json_serializable(obj):
     """Convert numpy types and other non-serializable types to JSON-compatible types."""
     if isinstance(obj, (np.integer, np.int64, np.int32)):
@@ -36,10 +63,23 @@ class Orchestrator:
     def __init__(self, X_train: pd.DataFrame, X_val: pd.DataFrame, X_test: pd.DataFrame,
                  y_train: pd.Series, y_val: pd.Series, y_test: pd.Series,
                  search_space: SearchSpace, metric: str, objective: str,
-                 search_budget: int, use_quantum: bool = True):
-        self.X_train = X_train
-        self.X_val = X_val
-        self.X_test = X_test
+                 search_budget: int, use_quantum: bool = True, n_workers: int = 1,
+                 multi_fidelity: bool = False, min_fidelity: float = 0.1,
+                 reduction_factor: int = 3, feature_selection: str = 'prefix',
+                 cache_dir: Optional[str] = None, cache_max_bytes: int = 1024 ** 3,
+                 checkpoint_path: Optional[str] = None,
+                 time_budget_seconds: Optional[float] = None,
+                 trial_timeout_seconds: Optional[float] = None,
+                 top_k: int = 5, leaderboard_max_bytes: int = 512 * 1024 ** 2,
+                 spill_dir: Optional[str] = None, history_path: Optional[str] = None,
+                 warm_start_configs: Optional[List[Dict[str, Any]]] = None,
+                 ensemble_size: int = 0, cost_aware: bool = False,
+                 coordinator_path: Optional[str] = None, cv_folds: Optional[int] = None,
+                 train_scoring: str = 'final', dtype: Optional[np.dtype] = None,
+                 path_trials: bool = False, svm_max_rows: Optional[int] = None,
+                 n_cores: Optional[int] = None, pin_cpus: bool = False,
+                 trial_memory_limit_bytes: Optional[int] = None,
+                 importance_repeats: int = 5, importance_max_rows: Optional[int] = 10000):
         self.y_train = y_train
         self.y_val = y_val
         self.y_test = y_test
@@ -48,15 +88,78 @@ class Orchestrator:
         self.objective = objective
         self.search_budget = search_budget
         self.use_quantum = use_quantum
+        self.n_workers = resolve_n_workers(n_workers)
+        self.reduction_factor = reduction_factor
+        self.feature_selection = feature_selection
+        self.checkpoint_path = checkpoint_path
+        self.coordinator_path = coordinator_path
+        self.checkpoint = None
+        self._quantum_future = None
+        self._quantum_started = None
+        self._quantum_queue = deque()
+        self._quantum_exhausted = False
+        self._trial_started = {}
+        self.time_budget_seconds = time_budget_seconds
+        self.trial_timeout_seconds = trial_timeout_seconds
+        if trial_memory_limit_bytes is not None and not memory_limit_supported():
+            logger.warning("trial_memory_limit_bytes needs Linux /proc to measure memory; ignoring it")
+            trial_memory_limit_bytes = None
+        self.trial_memory_limit_bytes = trial_memory_limit_bytes
+        self.importance_repeats = importance_repeats
+        self.importance_max_rows = importance_max_rows
+        # Per-model caps on memory-heavy hyperparameters, lowered when a trial runs out of memory
+        self.memory_caps: Dict[str, Any] = {}
+        self.deadline = None
+        self.feature_ranking = rank_features(X_train, y_train, search_space.is_classification)
+        
+        # (fraction, row_indices) per rung, smallest first; the last rung is the full split
+        if multi_fidelity:
+            self.fidelity_rungs = fidelity_subsets(y_train, min_fidelity, reduction_factor)
+        else:
+            self.fidelity_rungs = [(1.0, None)]
+        
+        # Each local worker slot gets a fixed share of the cores; remote workers size themselves
+        self.thread_budget = ThreadBudget(n_cores, 1 if coordinator_path else self.n_workers, pin_cpus)
+        
+        # Fold indices are computed once; folds of a trial share the cores of its slot
+        self.folds = cv_fold_indices(y_train, cv_folds) if cv_folds else None
+        self.fold_jobs = 1
+        if cv_folds:
+            self.fold_jobs = max(1, min(cv_folds, self.thread_budget.threads(0)))
+        
+        # Grids of the hyperparameters whose other values one fit can also score
+        path_grids = {}
+        if path_trials:
+            for model_name, param in PATH_PARAMS.items():
+                if param in search_space.model_spaces.get(model_name, {}):
+                    path_grids[model_name] = list(search_space.model_spaces[model_name][param])
         
-        self.trainer = ModelTrainer(X_train, X_val, y_train, y_val, search_space.is_classification)
-        self.evaluator = Evaluator(self.trainer, metric, objective)
+        self.trainer = ModelTrainer(
+            X_train, X_val, y_train, y_val, search_space.is_classification,
+            folds=self.folds, fold_jobs=self.fold_jobs, train_scoring=train_scoring,
+            dtype=dtype, path_grids=path_grids, svm_max_rows=svm_max_rows,
+            n_jobs=self.thread_budget.n_cores
+        )
+        # The trainer holds the numpy splits; of the DataFrames only the layout is kept
+        self.feature_columns = list(X_train.columns)
+        self.split_sizes = {'train': len(X_train), 'validation': len(X_val), 'test': len(X_test)}
+        self.X_test = to_matrix(X_test, self.trainer.X_train.dtype)
+        self.cache = TrialCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.evaluator = Evaluator(self.trainer, metric, objective, self.cache)
         
         self.best_score = float('-inf') if objective == 'maximize' else float('inf')
         self.best_config = None
         self.best_model = None
         self.best_metrics = None
-        self.training_history = []
+        self.ensemble_size = ensemble_size
+        self.ensemble = None
+        self.ensemble_ranks = []
+        self.history = TrialHistory(history_path)
+        self.leaderboard = Leaderboard(
+            top_k, leaderboard_max_bytes,
+            maximize=objective == 'maximize',
+            spill_dir=spill_dir
+        )
         
         self.quantum_sampler = None
         if use_quantum:
@@ -65,6 +168,25 @@ class Orchestrator:
             except Exception as e:
                 logger.warning(f"Failed to initialize quantum sampler: {e}. Continuing with classical optimization only.")
                 self.use_quantum = False
+        
+        sources = ['tpe', 'quantum', 'random'] if self.use_quantum else ['tpe', 'random']
+        
+        # Fit times feed a runtime model; the cost_aware source proposes by EI per predicted second
+        self.runtime_model = None
+        self.cost_proposer = None
+        if cost_aware:
+            self.runtime_model = RuntimeModel(ConfigEncoder(search_space))
+            self.cost_proposer = CostAwareProposer(
+                search_space, self.runtime_model, maximize=objective == 'maximize'
+            )
+            sources.append('cost_aware')
+        self.allocator = BudgetAllocator(sources)
+        
+        # Best configs of similar past runs, tried before any other source
+        self._warm_start_queue = deque(
+            self._warm_start_candidate(config) for config in (warm_start_configs or [])
+            if config.get('model') in self.search_space.model_names
+        )
     
     def run(self) -> Dict[str, Any]:
         """Run the AutoML optimization loop.
@@ -75,129 +197,766 @@ class Orchestrator:
         Raises:
             MetisTrainingError: If optimization fails
         """
+        pool = None
         try:
+            if self.time_budget_seconds:
+                self.deadline = time.monotonic() + self.time_budget_seconds
+            
+            if self.checkpoint_path:
+                self.checkpoint = Checkpoint(self.checkpoint_path, self._run_key())
+                state = self.checkpoint.load()
+                if state is not None:
+                    self._restore_checkpoint(state)
+            
+            pruner = None
+            if len(self.fidelity_rungs) > 1:
+                pruner = optuna.pruners.SuccessiveHalvingPruner(
+                    min_resource=1,
+                    reduction_factor=self.reduction_factor,
+                    min_early_stopping_rate=0,
+                )
+            
             study = optuna.create_study(
-                direction='maximize' if self.objective == 'maximize' else 'minimize'
+                study_name=Checkpoint.STUDY_NAME,
+                storage=self.checkpoint.storage_url if self.checkpoint else None,
+                load_if_exists=True,
+                direction='maximize' if self.objective == 'maximize' else 'minimize',
+                pruner=pruner
             )
+            finished_trials = self._finish_stale_trials(study)
+            if finished_trials:
+                # A resumed run already tried its warm-start configs
+                self._warm_start_queue.clear()
             
-            def objective(trial):
-                model_name = trial.suggest_categorical('model', tuple(self.search_space.model_names))
-                
-                config = {
-                    'model': model_name,
-                    'hyperparameters': {},
-                }
-                
-                model_space = self.search_space.model_spaces[model_name]
-                for param, values in model_space.items():
-                    numeric_values = [v for v in values if v is not None and isinstance(v, (int, float))]
-                    if numeric_values:
-                        if isinstance(numeric_values[0], int):
-                            config['hyperparameters'][param] = trial.suggest_int(
-                                f'{model_name}_{param}', min(numeric_values), max(numeric_values)
-                            )
-                        else:
-                            config['hyperparameters'][param] = trial.suggest_float(
-                                f'{model_name}_{param}', min(numeric_values), max(numeric_values)
-                            )
-                    else:
-                        config['hyperparameters'][param] = trial.suggest_categorical(
-                                f'{model_name}_{param}', tuple(values)
-                        )
-                
-                num_features = trial.suggest_int('num_features', 1, self.search_space.max_features)
-                import random
-                selected_indices = random.sample(range(self.search_space.num_features), min(num_features, self.search_space.num_features))
-                feature_mask = [i in selected_indices for i in range(self.search_space.num_features)]
-                config['feature_mask'] = feature_mask
-                
-                try:
-                    result = self.evaluator.evaluate_config(config)
-                    score = result['score']
-                    
-                    self.training_history.append({
-                        'iteration': len(self.training_history) + 1,
-                        'score': float(result['metrics']['validation_score']),
-                        'config': convert_to_json_serializable(config),
-                    })
-                    
-                    if (self.objective == 'maximize' and score > self.best_score) or \
-                       (self.objective == 'minimize' and score < self.best_score):
-                        self.best_score = score
-                        self.best_config = config
-                        self.best_model = result['model']
-                        self.best_metrics = result['metrics']
-                    
-                    return score
-                except Exception as e:
-                    logger.warning(f"Error in trial: {e}")
-                    return float('-inf') if self.objective == 'maximize' else float('inf')
+            if self.coordinator_path:
+                pool = DistributedPool(
+                    self.coordinator_path,
+                    self.trainer.X_train, self.trainer.X_val, self.trainer.y_train, self.trainer.y_val,
+                    self.search_space.is_classification,
+                    self.metric, self.objective,
+                    row_subsets=[rows for _, rows in self.fidelity_rungs],
+                    cache=self.cache,
+                    trial_timeout=self.trial_timeout_seconds,
+                    deadline=self.deadline,
+                    folds=self.folds,
+                    fold_jobs=self.fold_jobs,
+                    train_scoring=self.trainer.train_scoring,
+                    feature_names=self.trainer.feature_names,
+                    path_grids=self.trainer.path_grids,
+                    svm_max_rows=self.trainer.svm_max_rows
+                )
+            # Time and memory limits are enforced by killing worker processes, so they need the pool
+            elif self.n_workers > 1 or self.deadline is not None or self.trial_timeout_seconds \
+                    or self.trial_memory_limit_bytes:
+                pool = TrialPool(
+                    self.trainer.X_train, self.trainer.X_val, self.trainer.y_train, self.trainer.y_val,
+                    self.search_space.is_classification,
+                    self.metric, self.objective, self.n_workers,
+                    row_subsets=[rows for _, rows in self.fidelity_rungs],
+                    cache=self.cache,
+                    trial_timeout=self.trial_timeout_seconds,
+                    deadline=self.deadline,
+                    folds=self.folds,
+                    fold_jobs=self.fold_jobs,
+                    train_scoring=self.trainer.train_scoring,
+                    feature_names=self.trainer.feature_names,
+                    path_grids=self.trainer.path_grids,
+                    svm_max_rows=self.trainer.svm_max_rows,
+                    thread_budget=self.thread_budget,
+                    memory_limit=self.trial_memory_limit_bytes,
+                    can_fork=self._quantum_idle
+                )
             
-            classical_budget = int(self.search_budget * 0.7)
-            study.optimize(objective, n_trials=classical_budget)
+            n_trials = max(0, self.search_budget - finished_trials)
+            if 'quantum' in self.allocator.sources:
+                self._start_quantum_generation(n_trials)
             
-            if self.use_quantum and self.quantum_sampler:
-                quantum_budget = self.search_budget - classical_budget
-                self._run_quantum_sampling(quantum_budget)
+            self._optimize(study, n_trials, pool)
             
             if self.best_model is None:
                 raise MetisTrainingError("No valid model found during optimization")
             
-            from metis.utils.feature_engineering import select_features
-            X_test_selected, _ = select_features(
-                self.X_test, self.y_test, feature_mask=self.best_config['feature_mask']
-            )
-            test_score = self.trainer._compute_score(
-                self.best_model, X_test_selected, self.y_test, self.metric
-            )
+            if self.ensemble_size > 0:
+                self.ensemble = self._select_ensemble()
             
-            selected_features = self.search_space.decode_feature_mask(self.best_config['feature_mask'])
-            
-            feature_importance = self.best_metrics.get('feature_importance', {})
+            if self.ensemble is not None:
+                best_model = self._ensemble_summary()
+            else:
+                if self.best_metrics.get('approximation'):
+                    self._refit_exact(pool if isinstance(pool, TrialPool) else None)
+                feature_mask = self.best_config['feature_mask']
+                test_score = self.trainer._compute_score(
+                    self.best_model, self.trainer.transform(self.X_test, feature_mask),
+                    np.asarray(self.y_test), self.metric
+                )
+                if self.trainer.train_scoring != 'full' or self.best_metrics.get('train_score') is None:
+                    # Trials skipped or subsampled train scoring; score the winner exactly once
+                    self.best_metrics['train_score'] = self.trainer._compute_score(
+                        self.best_model, self.trainer._select(self.trainer.X_train, feature_mask),
+                        self.trainer.y_train, self.metric
+                    )
+                best_model = {
+                    'name': self.best_config['model'],
+                    'hyperparameters': convert_to_json_serializable(self.best_config['hyperparameters']),
+                    'selected_features': self.search_space.decode_feature_mask(self.best_config['feature_mask']),
+                    'metrics': {
+                        'train_score': float(self.best_metrics['train_score']),
+                        'validation_score': float(self.best_metrics['validation_score']),
+                        'test_score': float(test_score) if test_score is not None else None,
+                    },
+                    'feature_importance': self._feature_importance(
+                        self.best_model, self.trainer.transform(self.trainer.X_val, feature_mask),
+                        self.search_space.decode_feature_mask(feature_mask)
+                    ),
+                }
             
             result = {
                 'best_model': {
-                    'name': self.best_config['model'],
-                    'hyperparameters': convert_to_json_serializable(self.best_config['hyperparameters']),
-                    'selected_features': selected_features,
-                },
-                'metrics': {
-                    'train_score': float(self.best_metrics['train_score']),
-                    'validation_score': float(self.best_metrics['validation_score']),
-                    'test_score': float(test_score) if test_score is not None else None,
+                    'name': best_model['name'],
+                    'hyperparameters': best_model['hyperparameters'],
+                    'selected_features': best_model['selected_features'],
                 },
-                'feature_importance': convert_to_json_serializable(feature_importance),
-                'training_history': convert_to_json_serializable(self.training_history[:50]),
+                'metrics': best_model['metrics'],
+                'feature_importance': convert_to_json_serializable(best_model['feature_importance']),
+                'training_history': convert_to_json_serializable(self.history.head),
+                'leaderboard': convert_to_json_serializable([
+                    {
+                        **{key: value for key, value in entry.items() if key != 'feature_mask'},
+                        'selected_features': self.search_space.decode_feature_mask(entry['feature_mask']),
+                    }
+                    for entry in self.leaderboard.summary()
+                ]),
                 'data_splits': {
-                    'train': {
-                        'samples': len(self.X_train),
-                        'features': len(self.X_train.columns),
-                        'columns': list(self.X_train.columns)[:20],
-                    },
-                    'validation': {
-                        'samples': len(self.X_val),
-                        'features': len(self.X_val.columns),
-                        'columns': list(self.X_val.columns)[:20],
-                    },
-                    'test': {
-                        'samples': len(self.X_test),
-                        'features': len(self.X_test.columns),
-                        'columns': list(self.X_test.columns)[:20],
-                    },
+                    split: {
+                        'samples': samples,
+                        'features': len(self.feature_columns),
+                        'columns': self.feature_columns[:20],
+                    }
+                    for split, samples in self.split_sizes.items()
                 },
             }
             
             return result
         except Exception as e:
-            if isinstance(e, MetisTrainingError):
+            if isinstance(e, (MetisTrainingError, MetisConfigError)):
                 raise
             raise MetisTrainingError(f"Optimization failed: {str(e)}") from e
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            self.history.flush()
+    
+    def _feature_importance(self, model: Any, X_val: Any, feature_names: List[str]) -> Dict[str, float]:
+        """Permutation importance of the final model on the validation split.
+        
+        Permutations are scored on n_cores threads, each running the model
+        single-threaded, so together they stay within the core budget.
+        """
+        if self.importance_repeats == 0:
+            return {}
+        estimators = model.members if isinstance(model, EnsembleModel) else [model]
+        try:
+            with single_threaded(estimators):
+                return permutation_importance(
+                    lambda X, y: self.trainer._compute_score(model, X, y, self.metric),
+                    X_val, np.asarray(self.y_val), feature_names,
+                    n_repeats=self.importance_repeats, n_jobs=self.thread_budget.n_cores,
+                    max_rows=self.importance_max_rows
+                )
+        except Exception as e:
+            logger.warning(f"Could not compute feature importance: {e}")
+            return {}
+    
+    def _refit_exact(self, pool: Optional[TrialPool] = None):
+        """Replace a winning approximate SVM by the exact kernel SVM of the same config.
+        
+        With a pool the refit runs as a trial, under the same time and memory
+        limits. The approximate SVM is kept if the refit fails, is killed or
+        scores worse, so the best model and leaderboard rank 0 stay the best.
+        """
+        if self._out_of_time():
+            logger.warning("Time budget used up; keeping the approximate SVM instead of refitting the exact one")
+            return
+        logger.info(f"Best model is an approximate SVM ({self.best_metrics['approximation']}); refitting the exact SVM")
+        try:
+            if pool is not None:
+                future = pool.submit(self.best_config, exact=True)
+                pool.wait([future])
+                result = future.result()
+            else:
+                result = self.evaluator.evaluate_config(self.best_config, exact=True)
+        except Exception as e:
+            logger.warning(f"Exact SVM refit failed, keeping the approximate SVM: {e}")
+            return
+        score = result['score']
+        if (self.objective == 'maximize' and score < self.best_score) or \
+           (self.objective == 'minimize' and score > self.best_score):
+            logger.info(f"Exact SVM scored {score:.4f}, worse than the approximate SVM's "
+                        f"{self.best_score:.4f}; keeping the approximate SVM")
+            return
+        predictions = result['metrics'].pop('validation_predictions', None)
+        self.best_score = score
+        self.best_model = result['model']
+        self.best_metrics = result['metrics']
+        if self.leaderboard.entries and self.leaderboard.entries[0]['config'] == self.best_config:
+            self.leaderboard.replace(0, self.best_score, self.best_metrics, self.best_model, predictions)
+    
+    def _select_ensemble(self) -> Optional[EnsembleModel]:
+        """Greedily ensemble the leaderboard models from their cached validation predictions.
+        
+        Returns:
+            The ensemble if it scores better on the validation split than the
+            best single model, otherwise None
+        """
+        ranks = [
+            rank for rank, entry in enumerate(self.leaderboard.entries)
+            if entry['predictions'] is not None and (entry['model'] is not None or entry['path'] is not None)
+        ]
+        if len(ranks) < 2:
+            return None
+        
+        predictions = [self.leaderboard.entries[rank]['predictions'] for rank in ranks]
+        classes = self.trainer.classes
+        # Trainer scores are higher-is-better whatever the objective (error metrics are negated
+        # and the incumbent is the lowest negated score), so selection always maximizes them
+        weights = greedy_ensemble_selection(
+            predictions, self.y_val, self.metric, self.search_space.is_classification,
+            classes, ensemble_size=self.ensemble_size
+        )
+        if np.count_nonzero(weights) < 2:
+            return None
+        
+        averaged = sum(weight * p for weight, p in zip(weights, predictions) if weight > 0)
+        ensemble_score = score_predictions(
+            self.y_val, averaged, self.metric, self.search_space.is_classification, classes
+        )
+        single_score = max(
+            score_predictions(self.y_val, p, self.metric, self.search_space.is_classification, classes)
+            for p in predictions
+        )
+        if ensemble_score <= single_score:
+            return None
+        
+        members, member_weights, columns = [], [], []
+        self.ensemble_ranks = []
+        for rank, weight in zip(ranks, weights):
+            if weight <= 0:
+                continue
+            entry = self.leaderboard.entries[rank]
+            members.append(self.leaderboard.get_model(rank))
+            member_weights.append(float(weight))
+            columns.append(self.search_space.decode_feature_mask(entry['config']['feature_mask']))
+            self.ensemble_ranks.append(rank)
+        
+        logger.info(f"Ensemble of {len(members)} models improves validation score over the best single model")
+        return EnsembleModel(
+            members, member_weights, columns, self.search_space.is_classification, classes
+        )
+    
+    def _ensemble_summary(self) -> Dict[str, Any]:
+        """Name, members, scores and feature importance of the selected ensemble."""
+        used = set(name for columns in self.ensemble.feature_columns for name in columns)
+        selected_features = [name for name in self.search_space.feature_names if name in used]
+        
+        scores = {
+            split: self.trainer._compute_score(self.ensemble, self._frame(X)[selected_features], y, self.metric)
+            for split, X, y in [
+                ('train_score', self.trainer.X_train, self.y_train),
+                ('validation_score', self.trainer.X_val, self.y_val),
+                ('test_score', self.X_test, self.y_test),
+            ]
+        }
+        
+        members = []
+        for rank, weight in zip(self.ensemble_ranks, self.ensemble.weights):
+            entry = self.leaderboard.entries[rank]
+            members.append({
+                'rank': rank,
+                'trial': entry['trial'],
+                'model': str(entry['config']['model']),
+                'weight': weight,
+                'hyperparameters': convert_to_json_serializable(entry['config']['hyperparameters']),
+            })
+        
+        return {
+            'name': 'ensemble',
+            'hyperparameters': {'members': members},
+            'selected_features': selected_features,
+            'metrics': {split: float(score) for split, score in scores.items()},
+            'feature_importance': self._feature_importance(
+                self.ensemble, self._frame(self.trainer.X_val)[selected_features], selected_features
+            ),
+        }
+    
+    def _frame(self, X: np.ndarray) -> pd.DataFrame:
+        """View a split matrix as a DataFrame with the feature columns, e.g. for ensembles."""
+        return pd.DataFrame(X, columns=self.feature_columns, copy=False)
+    
+    def _run_key(self) -> str:
+        """Identify the data and search settings a checkpoint belongs to.
+        
+        search_budget is left out, so a rerun with a larger budget extends the search.
+        """
+        settings = json.dumps({
+            'metric': self.metric,
+            'objective': self.objective,
+            'model_names': self.search_space.model_names,
+            'max_features': self.search_space.max_features,
+            'feature_selection': self.feature_selection,
+            'fidelities': [fraction for fraction, _ in self.fidelity_rungs],
+            'cv_folds': len(self.folds) if self.folds else None,
+            'path_grids': self.trainer.path_grids,
+        }, sort_keys=True)
+        fingerprint = data_fingerprint(self.trainer.X_train, self.y_train, self.trainer.X_val, self.y_val)
+        return hashlib.sha256(f'{fingerprint}:{settings}'.encode()).hexdigest()
+    
+    def _restore_checkpoint(self, state: Dict[str, Any]):
+        """Restore history, stage progress and the incumbent from a checkpoint."""
+        self.history.load_state(state['history'])
+        self.allocator.load_state(state.get('allocator', {}))
+        self.memory_caps = dict(state.get('memory_caps', {}))
+        best = state.get('best')
+        if best is not None:
+            self.best_score = best['score']
+            self.best_config = best['config']
+            self.best_metrics = best['metrics']
+            self.best_model = best['model']
+            self.leaderboard.add(self.best_score, self.best_config, self.best_metrics, self.best_model)
+        logger.info(f"Resuming from checkpoint with {len(self.history)} recorded trials")
+    
+    def _save_checkpoint(self, best_changed: bool = False):
+        """Persist progress if checkpointing is enabled."""
+        if self.checkpoint is None:
+            return
+        
+        best = None
+        if best_changed:
+            best = {
+                'score': self.best_score,
+                'config': self.best_config,
+                'metrics': self.best_metrics,
+                'model': self.best_model,
+            }
+        self.checkpoint.save({
+            'history': self.history.state(),
+            'allocator': self.allocator.state(),
+            'memory_caps': self.memory_caps,
+        }, best)
+    
+    def _finish_stale_trials(self, study: optuna.Study) -> int:
+        """Count trials finished by earlier runs and fail the ones a crash left running.
+        
+        Returns:
+            Number of trials already finished, which are deducted from the budget
+        """
+        finished = 0
+        for trial in study.get_trials(deepcopy=False):
+            if trial.state == optuna.trial.TrialState.RUNNING:
+                study.tell(trial.number, state=optuna.trial.TrialState.FAIL)
+            elif trial.state != optuna.trial.TrialState.WAITING and trial.user_attrs.get('source') != 'path':
+                # Path points came free with another trial's fit
+                finished += 1
+        return finished
+    
+    def _suggest_config(self, trial: optuna.Trial) -> Dict[str, Any]:
+        """Build a candidate configuration from an Optuna trial."""
+        model_name = trial.suggest_categorical('model', tuple(self.search_space.model_names))
+        
+        config = {
+            'model': model_name,
+            'hyperparameters': {},
+        }
+        
+        model_space = self.search_space.model_spaces[model_name]
+        for param, values in model_space.items():
+            numeric_values = [v for v in values if v is not None and isinstance(v, (int, float))]
+            if numeric_values:
+                low, high = self._param_range(model_name, param, numeric_values)
+                if isinstance(numeric_values[0], int):
+                    config['hyperparameters'][param] = trial.suggest_int(f'{model_name}_{param}', low, high)
+                else:
+                    config['hyperparameters'][param] = trial.suggest_float(f'{model_name}_{param}', low, high)
+            else:
+                config['hyperparameters'][param] = trial.suggest_categorical(
+                        f'{model_name}_{param}', tuple(values)
+                )
+        
+        if 'feature_mask' in trial.user_attrs:
+            # Enqueued candidates (e.g. from the quantum sampler) carry their exact mask
+            feature_mask = list(trial.user_attrs['feature_mask'])
+            if self.feature_selection == 'mask':
+                for name in self.search_space.feature_names:
+                    trial.suggest_categorical(f'use_{name}', (True, False))
+            else:
+                trial.suggest_int('num_features', 1, self.search_space.max_features)
+        elif self.feature_selection == 'mask':
+            feature_mask = [
+                trial.suggest_categorical(f'use_{name}', (True, False))
+                for name in self.search_space.feature_names
+            ]
+            # Keep the mask within [1, max_features], dropping the lowest-ranked features
+            selected = [i for i in self.feature_ranking if feature_mask[i]]
+            if not selected:
+                selected = self.feature_ranking[:1]
+            feature_mask = self.search_space.prefix_feature_mask(
+                selected, self.search_space.max_features
+            )
+        else:
+            num_features = trial.suggest_int('num_features', 1, self.search_space.max_features)
+            feature_mask = self.search_space.prefix_feature_mask(self.feature_ranking, num_features)
+        config['feature_mask'] = feature_mask
+        
+        return config
+    
+    def _record_result(self, config: Dict[str, Any], result: Dict[str, Any],
+                       trial_number: Optional[int] = None, source: str = 'tpe'):
+        """Append a finished evaluation to the history and update the incumbent.
+        
+        Only ever called from the main process, so history and best-model
+        state stay consistent when parallel trials finish out of order.
+        
+        Returns:
+            Improvement over the previous incumbent (0 if it did not improve
+            or there was none)
+        """
+        score = result['score']
+        predictions = result['metrics'].pop('validation_predictions', None)
+        
+        entry = {
+            'iteration': len(self.history) + 1,
+            'score': float(result['metrics']['validation_score']),
+            'config': convert_to_json_serializable(config),
+            'status': 'complete',
+            'source': source,
+            'fit_seconds': result['metrics'].get('fit_seconds'),
+        }
+        if result['metrics'].get('approximation'):
+            entry['approximation'] = result['metrics']['approximation']
+        if trial_number is not None:
+            entry['trial'] = trial_number
+        self.history.append(entry)
+        
+        if self.runtime_model is not None:
+            if entry['fit_seconds'] is not None:
+                self.runtime_model.observe(config, entry['fit_seconds'])
+            self.cost_proposer.observe(config, score)
+        
+        best_changed = (self.objective == 'maximize' and score > self.best_score) or \
+                       (self.objective == 'minimize' and score < self.best_score)
+        improvement = 0.0
+        if best_changed and np.isfinite(self.best_score):
+            improvement = abs(score - self.best_score)
+        self.leaderboard.add(score, config, result['metrics'], result['model'], trial_number, predictions)
+        if best_changed:
+            self.best_score = score
+            self.best_config = config
+            self.best_model = result['model']
+            self.best_metrics = result['metrics']
+        
+        self._save_checkpoint(best_changed)
+        return improvement
+    
+    def _record_resource_failure(self, config: Dict[str, Any], error: Exception,
+                                 trial_number: Optional[int] = None, source: str = 'tpe'):
+        """Record a trial that ran out of memory and tighten the model's memory cap."""
+        entry = {
+            'iteration': len(self.history) + 1,
+            'score': None,
+            'config': convert_to_json_serializable(config),
+            'status': 'resource_failure',
+            'source': source,
+            'error': str(error),
+        }
+        if trial_number is not None:
+            entry['trial'] = trial_number
+        self.history.append(entry)
+        self._tighten_memory_cap(config)
+        self._save_checkpoint()
     
-    def _run_quantum_sampling(self, budget: int):
-        """Query quantum sampler for additional candidates."""
-        if not self.quantum_sampler:
+    def _tighten_memory_cap(self, config: Dict[str, Any]):
+        """Cap the failed config's memory-heavy hyperparameter below the value it used.
+        
+        The cap is the next smaller numeric value in the model's grid (the
+        largest one for an unbounded None), and only ever decreases.
+        """
+        model_name = config['model']
+        param = MEMORY_CAPPED_PARAMS.get(model_name)
+        values = self.search_space.model_spaces.get(model_name, {}).get(param, [])
+        grid = sorted(v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool))
+        if not grid:
             return
         
+        value = config['hyperparameters'].get(param)
+        smaller = [v for v in grid if value is None or v < value]
+        cap = smaller[-1] if smaller else grid[0]
+        if model_name not in self.memory_caps or cap < self.memory_caps[model_name]:
+            self.memory_caps[model_name] = cap
+            logger.warning(f"Capping {model_name} {param} at {cap} after a trial ran out of memory")
+    
+    def _param_range(self, model_name: str, param: str, numeric_values: List[Any]) -> Tuple[Any, Any]:
+        """Bounds of a numeric hyperparameter's distribution, narrowed to the model's memory cap.
+        
+        Optuna allows the range of a numeric parameter to change between
+        trials, so capped trials record the value they were trained with.
+        """
+        low, high = min(numeric_values), max(numeric_values)
+        if model_name in self.memory_caps and MEMORY_CAPPED_PARAMS.get(model_name) == param:
+            high = min(high, self.memory_caps[model_name])
+            low = min(low, high)
+        return low, high
+    
+    def _record_timeout(self, config: Dict[str, Any], trial_number: Optional[int] = None,
+                        source: str = 'tpe'):
+        """Record a trial that was killed for exceeding its time limit."""
+        entry = {
+            'iteration': len(self.history) + 1,
+            'score': None,
+            'config': convert_to_json_serializable(config),
+            'status': 'timeout',
+            'source': source,
+        }
+        if trial_number is not None:
+            entry['trial'] = trial_number
+        self.history.append(entry)
+        
+        # The true fit time is unknown but at least the limit, so steer away from similar configs
+        if self.runtime_model is not None and self.trial_timeout_seconds:
+            self.runtime_model.observe(config, self.trial_timeout_seconds)
+        self._save_checkpoint()
+    
+    def _out_of_time(self) -> bool:
+        """Whether the wall-clock time budget is used up."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+    
+    def _failed_score(self) -> float:
+        """Score reported to the sampler for trials that raised."""
+        return float('-inf') if self.objective == 'maximize' else float('inf')
+    
+    def _optimize(self, study: optuna.Study, n_trials: int, pool: Optional[TrialPool] = None):
+        """Run trials, dispatching them to the pool when one is given.
+        
+        In multi-fidelity mode each trial climbs the fidelity rungs one at a
+        time and is dropped as soon as the pruner decides it will not make
+        the top fraction of its rung.
+        """
+        if pool is None:
+            with threadpool_limits(limits=self.thread_budget.n_cores):
+                for submitted in range(n_trials):
+                    if self._out_of_time():
+                        break
+                    trial = self._ask(study, n_trials - submitted)
+                    config = self._suggest_config(trial)
+                    rung = 0
+                    while True:
+                        try:
+                            result = self.evaluator.evaluate_config(
+                                config, self.fidelity_rungs[rung][1], self._incumbent(rung)
+                            )
+                        except MetisResourceError as e:
+                            logger.warning(f"Trial {trial.number} ran out of memory: {e}")
+                            self._record_resource_failure(config, e, trial.number, self._trial_source(trial))
+                            self._credit_source(trial)
+                            study.tell(trial, state=optuna.trial.TrialState.FAIL)
+                            break
+                        except Exception as e:
+                            logger.warning(f"Error in trial: {e}")
+                            self._credit_source(trial)
+                            study.tell(trial, self._failed_score())
+                            break
+                        if self._handle_rung_result(study, trial, config, rung, result):
+                            break
+                        rung += 1
+            return
+        
+        pending = {}
+        submitted = 0
+        while (submitted < n_trials and not self._out_of_time()) or pending:
+            while submitted < n_trials and len(pending) < pool.n_workers and not self._out_of_time():
+                trial = self._ask(study, n_trials - submitted)
+                config = self._suggest_config(trial)
+                pending[pool.submit(config, 0, self._incumbent(0))] = (trial, config, 0)
+                submitted += 1
+            
+            if not pending:
+                continue
+            
+            done, _ = pool.wait(pending)
+            for future in done:
+                trial, config, rung = pending.pop(future)
+                try:
+                    result = future.result()
+                except MetisTimeoutError as e:
+                    logger.warning(f"Trial {trial.number} timed out: {e}")
+                    self._record_timeout(config, trial.number, self._trial_source(trial))
+                    self._credit_source(trial)
+                    study.tell(trial, state=optuna.trial.TrialState.FAIL)
+                    continue
+                except MetisResourceError as e:
+                    logger.warning(f"Trial {trial.number} ran out of memory: {e}")
+                    self._record_resource_failure(config, e, trial.number, self._trial_source(trial))
+                    self._credit_source(trial)
+                    study.tell(trial, state=optuna.trial.TrialState.FAIL)
+                    continue
+                except Exception as e:
+                    logger.warning(f"Error in trial: {e}")
+                    self._credit_source(trial)
+                    study.tell(trial, self._failed_score())
+                    continue
+                if not self._handle_rung_result(study, trial, config, rung, result):
+                    pending[pool.submit(config, rung + 1, self._incumbent(rung + 1))] = (trial, config, rung + 1)
+    
+    def _ask(self, study: optuna.Study, remaining: int) -> optuna.Trial:
+        """Start the next trial, letting the allocator pick which source proposes it.
+        
+        TPE trials come straight from the study; warm-start, quantum, random and
+        cost-aware candidates are enqueued first so the study's next ask() returns them.
+        Warm-start candidates always go first and are not charged to any source.
+        """
+        self._collect_quantum_candidates()
+        
+        # Only simulate another QAOA batch when the allocator actually wants one
+        if 'quantum' in self.allocator.sources and not self._quantum_queue and not self._quantum_exhausted:
+            if self.allocator.choose(self.allocator.sources) == 'quantum':
+                self._start_quantum_generation(remaining)
+        
+        available = [
+            source for source in self.allocator.sources
+            if source != 'quantum' or self._quantum_queue
+        ]
+        
+        candidate = None
+        if self._warm_start_queue:
+            source = 'warm_start'
+            candidate = self._warm_start_queue.popleft()
+        else:
+            source = self.allocator.choose(available)
+        
+        if source == 'quantum':
+            candidate = self._quantum_queue.popleft()
+        elif source == 'random':
+            candidate = self.search_space.sample_random_config()
+        elif source == 'cost_aware':
+            candidate = self.cost_proposer.propose()
+        
+        if candidate is not None:
+            study.enqueue_trial(
+                self._candidate_params(candidate),
+                user_attrs={
+                    'source': source,
+                    'feature_mask': [bool(v) for v in candidate['feature_mask']],
+                },
+            )
+        
+        trial = study.ask()
+        self._trial_started[trial.number] = time.monotonic()
+        return trial
+    
+    def _credit_source(self, trial: optuna.Trial, improvement: float = 0.0):
+        """Report a finished trial's improvement and run time to the allocator."""
+        started = self._trial_started.pop(trial.number, None)
+        seconds = time.monotonic() - started if started is not None else 0.0
+        source = self._trial_source(trial)
+        if source in self.allocator.sources:
+            self.allocator.record(source, improvement, seconds)
+    
+    def _handle_rung_result(self, study: optuna.Study, trial: optuna.Trial,
+                            config: Dict[str, Any], rung: int, result: Dict[str, Any]) -> bool:
+        """Report a rung result to the study.
+        
+        Returns:
+            True if the trial is finished (completed or pruned), False if it
+            should be promoted to the next rung
+        """
+        if result['metrics'].get('cv_aborted'):
+            self._record_pruned(study, trial, config, rung, result)
+            return True
+        
+        if rung == len(self.fidelity_rungs) - 1:
+            improvement = self._record_result(config, result, trial.number, self._trial_source(trial))
+            self._credit_source(trial, improvement)
+            study.tell(trial, result['score'])
+            self._record_path(study, trial, result)
+            return True
+        
+        trial.report(result['score'], step=self.reduction_factor ** rung)
+        if trial.should_prune() or self._out_of_time():
+            self._record_pruned(study, trial, config, rung, result)
+            return True
+        return False
+    
+    def _record_path(self, study: optuna.Study, trial: optuna.Trial, result: Dict[str, Any]):
+        """Add the extra points scored from a trial's fit to the study as completed trials.
+        
+        They take the trial's parameters with the path hyperparameter changed,
+        are recorded with source 'path' and do not count against the budget.
+        """
+        for point in result.get('path', []):
+            config = point['config']
+            params = dict(trial.params)
+            for param, value in config['hyperparameters'].items():
+                key = f"{config['model']}_{param}"
+                if key in params:
+                    params[key] = value
+            try:
+                study.add_trial(optuna.trial.create_trial(
+                    params=params,
+                    distributions=trial.distributions,
+                    value=point['score'],
+                    user_attrs={
+                        'source': 'path',
+                        'parent': trial.number,
+                        'feature_mask': [bool(v) for v in config['feature_mask']],
+                    },
+                ))
+            except ValueError as e:
+                logger.warning(f"Could not add path point of trial {trial.number}: {e}")
+                continue
+            number = study.get_trials(deepcopy=False)[-1].number
+            self._record_result(config, point, number, 'path')
+    
+    def _record_pruned(self, study: optuna.Study, trial: optuna.Trial,
+                       config: Dict[str, Any], rung: int, result: Dict[str, Any]):
+        """Record a trial dropped at a low fidelity or by early cross-validation abort."""
+        metrics = result['metrics']
+        entry = {
+            'iteration': len(self.history) + 1,
+            'score': float(metrics['validation_score']),
+            'config': convert_to_json_serializable(config),
+            'trial': trial.number,
+            'status': 'pruned',
+            'source': self._trial_source(trial),
+            'fidelity': self.fidelity_rungs[rung][0],
+            'fit_seconds': metrics.get('fit_seconds'),
+        }
+        if metrics.get('cv_aborted'):
+            entry['cv_scores'] = convert_to_json_serializable(metrics['cv_scores'])
+        if metrics.get('approximation'):
+            entry['approximation'] = metrics['approximation']
+        self.history.append(entry)
+        # Aborted cross-validation only fitted some folds, so its time says little about the config
+        if self.runtime_model is not None and metrics.get('fit_seconds') is not None \
+                and not metrics.get('cv_aborted'):
+            self.runtime_model.observe(config, metrics['fit_seconds'], self.fidelity_rungs[rung][0])
+        self._save_checkpoint()
+        self._credit_source(trial)
+        study.tell(trial, state=optuna.trial.TrialState.PRUNED)
+    
+    def _incumbent(self, rung: int) -> Optional[float]:
+        """Best trainer score so far, passed along so cross-validation can abort clearly worse trials.
+        
+        Only full-fidelity evaluations are compared, since scores on row
+        subsamples are not comparable to the incumbent's.
+        """
+        if self.folds is None or self.best_metrics is None or rung != len(self.fidelity_rungs) - 1:
+            return None
+        return self.best_metrics['validation_score']
+    
+    def _trial_source(self, trial: optuna.Trial) -> str:
+        """Name of the component that proposed a trial."""
+        return trial.user_attrs.get('source', 'tpe')
+    
+    def _generate_quantum_candidates(self, budget: int) -> List[Dict[str, Any]]:
+        """Query the quantum sampler for candidates; runs on a background thread."""
         try:
             request_data = {
                 'num_features': self.search_space.num_features,
@@ -209,32 +968,78 @@ class Orchestrator:
                 request_data, 
                 num_candidates=min(budget, 10)
             )
-            
-            for candidate in candidates:
-                try:
-                    if not self.search_space.validate_config(candidate):
-                        continue
-                    
-                    result = self.evaluator.evaluate_config(candidate)
-                    score = result['score']
-                    
-                    self.training_history.append({
-                        'iteration': len(self.training_history) + 1,
-                        'score': float(result['metrics']['validation_score']),
-                        'config': convert_to_json_serializable(candidate),
-                    })
-                    
-                    if (self.objective == 'maximize' and score > self.best_score) or \
-                       (self.objective == 'minimize' and score < self.best_score):
-                        self.best_score = score
-                        self.best_config = candidate
-                        self.best_model = result['model']
-                        self.best_metrics = result['metrics']
-                except Exception as e:
-                    logger.warning(f"Error evaluating quantum candidate: {e}")
-                    continue
+            return [c for c in candidates if self.search_space.validate_config(c)]
         except MetisQuantumError as e:
             logger.warning(f"Quantum sampling failed: {e}. Continuing with classical results only.")
         except Exception as e:
             logger.warning(f"Error in quantum sampling: {e}")
-
+        return []
+    
+    def _candidate_params(self, candidate: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a candidate configuration to trial parameters the sampler understands.
+        
+        Hyperparameter values outside the distributions used by _suggest_config
+        are left out, so the sampler fills them in.
+        """
+        model_name = candidate['model']
+        params = {'model': model_name}
+        
+        model_space = self.search_space.model_spaces[model_name]
+        for param, value in candidate['hyperparameters'].items():
+            if param not in model_space:
+                continue
+            values = model_space[param]
+            numeric_values = [v for v in values if v is not None and isinstance(v, (int, float))]
+            if numeric_values:
+                low, high = self._param_range(model_name, param, numeric_values)
+                if isinstance(value, (int, float)) and low <= value <= high:
+                    params[f'{model_name}_{param}'] = value
+            elif value in values:
+                params[f'{model_name}_{param}'] = value
+        
+        feature_mask = candidate['feature_mask']
+        if self.feature_selection == 'mask':
+            for name, selected in zip(self.search_space.feature_names, feature_mask):
+                params[f'use_{name}'] = bool(selected)
+        else:
+            params['num_features'] = int(sum(feature_mask))
+        return params
+    
+    def _warm_start_candidate(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a config from the meta index into a candidate for this dataset.
+        
+        Feature masks do not carry over between datasets, so the stored
+        fraction of selected features is applied to this dataset's ranking.
+        """
+        num_features = int(round(config.get('feature_fraction', 1.0) * self.search_space.num_features))
+        num_features = min(max(num_features, 1), self.search_space.max_features)
+        return {
+            'model': config['model'],
+            'hyperparameters': dict(config.get('hyperparameters', {})),
+            'feature_mask': self.search_space.prefix_feature_mask(self.feature_ranking, num_features),
+        }
+    
+    def _start_quantum_generation(self, remaining: int):
+        """Simulate a batch of QAOA candidates on a background thread."""
+        if self._quantum_future is not None:
+            return
+        executor = ThreadPoolExecutor(max_workers=1)
+        self._quantum_started = time.monotonic()
+        self._quantum_future = executor.submit(self._generate_quantum_candidates, remaining)
+        executor.shutdown(wait=False)
+    
+    def _quantum_idle(self) -> bool:
+        """Whether no QAOA batch is being simulated on the background thread."""
+        return self._quantum_future is None or self._quantum_future.done()
+    
+    def _collect_quantum_candidates(self):
+        """Queue the candidates of a finished background batch and charge its run time."""
+        if self._quantum_future is None or not self._quantum_future.done():
+            return
+        
+        candidates = self._quantum_future.result()
+        self._quantum_future = None
+        if not candidates:
+            self._quantum_exhausted = True
+        self._quantum_queue.extend(candidates)
+        self.allocator.record('quantum', 0.0, time.monotonic() - self._quantum_started, trials=0)
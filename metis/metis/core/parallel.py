@@ -0,0 +1,371 @@
+"""Process-pool backend for running AutoML trials concurrently."""
+
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import Future, FIRST_COMPLETED
+from multiprocessing.connection import wait as wait_connections
+from typing import Callable, Dict, Any, Optional, List, Iterable, Set, Tuple
+
+import joblib
+import numpy as np
+
+from metis.core.trainer import ModelTrainer
+from metis.core.evaluator import Evaluator
+from metis.core.cache import TrialCache
+from metis.core.resources import ThreadBudget, limit_threads, limit_address_space, process_private_bytes
+from metis.exceptions import MetisTrainingError, MetisTimeoutError, MetisResourceError
+
+# Seconds between checks whether an empty worker slot can be refilled
+RESPAWN_POLL_INTERVAL = 0.1
+
+_worker_evaluator: Optional[Evaluator] = None
+_worker_row_subsets: List[Optional[np.ndarray]] = []
+_worker_memory_limit: Optional[int] = None
+_worker_threads: int = 1
+
+
+def resolve_n_workers(n_workers: int) -> int:
+    """Resolve the requested worker count (-1 means one worker per CPU)."""
+    if n_workers == -1:
+        return os.cpu_count() or 1
+    return n_workers
+
+
+def _init_worker(data_path: str, is_classification: bool, metric: str, objective: str,
+                 cache: Optional[TrialCache], fold_jobs: int = 1,
+                 n_threads: Optional[int] = None, cpus: Optional[List[int]] = None,
+                 memory_limit: Optional[int] = None):
+    """Apply the worker's thread allotment and load the shared training data once per worker process."""
+    global _worker_evaluator, _worker_row_subsets, _worker_memory_limit, _worker_threads
+    if n_threads is not None:
+        limit_threads(n_threads, cpus)
+    _worker_memory_limit = memory_limit
+    _worker_threads = n_threads or os.cpu_count() or 1
+    data = joblib.load(data_path, mmap_mode='r')
+    _worker_row_subsets = data['row_subsets']
+    trainer = ModelTrainer(
+        data['X_train'], data['X_val'],
+        data['y_train'], data['y_val'],
+        is_classification,
+        folds=data['folds'],
+        fold_jobs=fold_jobs,
+        train_scoring=data['train_scoring'],
+        feature_names=data['feature_names'],
+        path_grids=data['path_grids'],
+        svm_max_rows=data['svm_max_rows'],
+        n_jobs=n_threads
+    )
+    _worker_evaluator = Evaluator(trainer, metric, objective, cache)
+
+
+def _evaluate_in_worker(config: Dict[str, Any], rung: Optional[int] = None,
+                        incumbent: Optional[float] = None, exact: bool = False) -> Dict[str, Any]:
+    """Evaluate a configuration inside a worker process."""
+    row_indices = _worker_row_subsets[rung] if rung is not None else None
+    return _worker_evaluator.evaluate_config(config, row_indices, incumbent, exact)
+
+
+def _worker_main(conn, init_args: Tuple, memory_base=None):
+    """Worker loop: evaluate (config, rung, incumbent, exact) tasks received over a pipe until told to stop.
+    
+    With a memory limit, each task first caps the worker's address space
+    and publishes its private memory in memory_base, the baseline the
+    parent measures the trial's allocations against.
+    """
+    _init_worker(*init_args)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        
+        config, rung, incumbent, exact = task
+        if _worker_memory_limit is not None:
+            limit_address_space(_worker_memory_limit, _worker_threads)
+            memory_base.value = process_private_bytes(os.getpid()) or 0
+        try:
+            conn.send((True, _evaluate_in_worker(config, rung, incumbent, exact)))
+        except Exception as e:
+            if isinstance(e, MemoryError):
+                e = MetisResourceError(f"Out of memory: {str(e)}")
+            try:
+                conn.send((False, e))
+            except Exception:
+                conn.send((False, MetisTrainingError(str(e))))
+
+
+class _Worker:
+    """A worker process and the task it is currently running."""
+    
+    def __init__(self, mp_context, init_args: Tuple, track_memory: bool = False):
+        self.conn, child_conn = mp_context.Pipe()
+        # Private memory of the worker when its current task started, or -1 until it has started
+        self.memory_base = mp_context.Value('q', -1, lock=False) if track_memory else None
+        self.process = mp_context.Process(
+            target=_worker_main, args=(child_conn, init_args, self.memory_base), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.future: Optional[Future] = None
+        self.kill_at: Optional[float] = None
+    
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class TrialPool:
+    """Pool of worker processes that evaluate candidate configurations.
+    
+    The training and validation splits are written to disk once and every
+    worker opens them as memory-mapped arrays, so the DataFrames are never
+    pickled per trial. Each worker is its own process, so a trial that runs
+    past its time limit is killed and the worker replaced without touching
+    the others.
+    
+    The pool is driven from the caller's thread: results are collected and
+    time limits enforced inside wait().
+    
+    With a thread_budget, worker i caps its BLAS/OpenMP pools and its models'
+    n_jobs at slot i's allotment (and is pinned to the slot's CPUs if the
+    budget pins), so concurrent trials together use the budget's cores.
+    
+    With memory_limit (bytes), a trial may allocate that much on top of
+    what its worker held when the trial started (Linux). Busy workers'
+    private memory is checked every memory_poll_interval seconds and a
+    worker over the limit is killed; allocations too fast for polling hit
+    the worker's address-space cap and fail with MemoryError. Either way
+    the trial fails with MetisResourceError, as does a trial whose worker
+    is killed by the OS (SIGKILL, e.g. the OOM killer).
+    
+    Workers are forked. Forking while another thread of the caller holds a
+    lock can deadlock the child, so with can_fork a killed worker is only
+    replaced once can_fork() is true (e.g. once a background thread has
+    finished); until then its slot stays empty.
+    """
+    
+    def __init__(self, X_train: np.ndarray, X_val: np.ndarray,
+                 y_train: np.ndarray, y_val: np.ndarray, is_classification: bool,
+                 metric: str, objective: str, n_workers: int,
+                 row_subsets: Optional[List[Optional[np.ndarray]]] = None,
+                 cache: Optional[TrialCache] = None,
+                 trial_timeout: Optional[float] = None,
+                 deadline: Optional[float] = None,
+                 folds: Optional[List[Tuple[np.ndarray, np.ndarray]]] = None,
+                 fold_jobs: int = 1, train_scoring: str = 'final',
+                 feature_names: Optional[List[str]] = None,
+                 path_grids: Optional[Dict[str, List[Any]]] = None,
+                 svm_max_rows: Optional[int] = None,
+                 thread_budget: Optional[ThreadBudget] = None,
+                 memory_limit: Optional[int] = None,
+                 memory_poll_interval: float = 0.5,
+                 can_fork: Optional[Callable[[], bool]] = None):
+        self.n_workers = n_workers
+        self._can_fork = can_fork or (lambda: True)
+        self.memory_limit = memory_limit
+        self.memory_poll_interval = memory_poll_interval
+        self.trial_timeout = trial_timeout
+        self.deadline = deadline
+        self._tmp_dir = tempfile.mkdtemp(prefix='metis-')
+        data_path = os.path.join(self._tmp_dir, 'data.joblib')
+        joblib.dump({
+            'X_train': X_train,
+            'X_val': X_val,
+            'y_train': y_train,
+            'y_val': y_val,
+            'row_subsets': row_subsets or [],
+            'folds': folds,
+            'train_scoring': train_scoring,
+            'feature_names': feature_names,
+            'path_grids': path_grids,
+            'svm_max_rows': svm_max_rows,
+        }, data_path)
+        
+        # Prefer fork so models registered with metis.add are visible to workers (and scripts
+        # need no __main__ guard); the caller's threads are guarded against with can_fork
+        if 'fork' in multiprocessing.get_all_start_methods():
+            self._mp_context = multiprocessing.get_context('fork')
+        else:
+            self._mp_context = multiprocessing.get_context()
+        
+        self._init_args = (data_path, is_classification, metric, objective, cache, fold_jobs)
+        self.thread_budget = thread_budget
+        self._workers: List[Optional[_Worker]] = [self._start_worker(index) for index in range(n_workers)]
+        self._queue = deque()
+    
+    def submit(self, config: Dict[str, Any], rung: Optional[int] = None,
+               incumbent: Optional[float] = None, exact: bool = False) -> Future:
+        """Schedule a configuration for evaluation.
+        
+        Args:
+            config: Candidate configuration
+            rung: Index into row_subsets to train on a row subsample, or None
+                for the full training split
+            incumbent: Best score so far, for early abort of cross-validation
+            exact: Fit the exact model where trials approximate it
+        
+        Returns:
+            Future resolved by wait(). It raises MetisTimeoutError if the trial
+            is killed for exceeding trial_timeout or the pool deadline, and
+            MetisResourceError if it exceeds the memory limit.
+        """
+        future = Future()
+        self._queue.append((future, config, rung, incumbent, exact))
+        self._dispatch()
+        return future
+    
+    def _dispatch(self):
+        self._respawn()
+        for worker in self._workers:
+            if not self._queue:
+                return
+            if worker is None or worker.future is not None:
+                continue
+            
+            future, config, rung, incumbent, exact = self._queue.popleft()
+            future.set_running_or_notify_cancel()
+            
+            limits = []
+            if self.trial_timeout:
+                limits.append(time.monotonic() + self.trial_timeout)
+            if self.deadline is not None:
+                limits.append(self.deadline)
+            worker.kill_at = min(limits) if limits else None
+            worker.future = future
+            if worker.memory_base is not None:
+                worker.memory_base.value = -1
+            worker.conn.send((config, rung, incumbent, exact))
+    
+    def _worker_args(self, index: int) -> Tuple:
+        """Init arguments of the worker in a slot, including its share of the thread budget."""
+        if self.thread_budget is None:
+            return self._init_args + (None, None, self.memory_limit)
+        return self._init_args + (
+            self.thread_budget.threads(index), self.thread_budget.cpus(index), self.memory_limit
+        )
+    
+    def _start_worker(self, index: int) -> '_Worker':
+        return _Worker(self._mp_context, self._worker_args(index), self.memory_limit is not None)
+    
+    def _replace(self, index: int):
+        self._workers[index].stop(kill=True)
+        self._workers[index] = None
+        self._respawn()
+    
+    def _respawn(self):
+        """Start workers in empty slots, unless forking is unsafe right now."""
+        if None not in self._workers or not self._can_fork():
+            return
+        for index, worker in enumerate(self._workers):
+            if worker is None:
+                self._workers[index] = self._start_worker(index)
+    
+    @staticmethod
+    def _exit_error(process: multiprocessing.Process) -> Exception:
+        """Error for a trial whose worker died; SIGKILL means the OS (OOM killer) stopped it."""
+        if process.exitcode == -signal.SIGKILL:
+            return MetisResourceError(
+                "Worker process was killed by the operating system, most likely out of memory"
+            )
+        return MetisTrainingError(f"Worker process exited unexpectedly (exit code {process.exitcode})")
+    
+    def _poll(self):
+        """Block until a worker finishes, dies or hits its time limit, then handle it."""
+        busy = [worker for worker in self._workers if worker is not None and worker.future is not None]
+        kill_times = [worker.kill_at for worker in busy if worker.kill_at is not None]
+        timeout = max(0.0, min(kill_times) - time.monotonic()) if kill_times else None
+        if self.memory_limit is not None and busy:
+            timeout = self.memory_poll_interval if timeout is None else min(timeout, self.memory_poll_interval)
+        if None in self._workers and self._queue:
+            # Come back to start the missing workers once forking is safe again
+            timeout = RESPAWN_POLL_INTERVAL if timeout is None else min(timeout, RESPAWN_POLL_INTERVAL)
+        handles = [worker.conn for worker in busy] + [worker.process.sentinel for worker in busy]
+        ready = set(wait_connections(handles, timeout=timeout))
+        
+        now = time.monotonic()
+        for index, worker in enumerate(self._workers):
+            if worker is None or worker.future is None:
+                continue
+            future = worker.future
+            
+            if worker.conn in ready:
+                try:
+                    ok, payload = worker.conn.recv()
+                except (EOFError, OSError):
+                    worker.future = None
+                    worker.process.join(timeout=1.0)
+                    future.set_exception(self._exit_error(worker.process))
+                    self._replace(index)
+                    continue
+                worker.future = None
+                if ok:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(payload)
+            elif worker.process.sentinel in ready:
+                worker.future = None
+                future.set_exception(self._exit_error(worker.process))
+                self._replace(index)
+            elif worker.kill_at is not None and now >= worker.kill_at:
+                worker.future = None
+                future.set_exception(MetisTimeoutError("Trial exceeded its time limit and was killed"))
+                self._replace(index)
+            elif worker.memory_base is not None and worker.memory_base.value >= 0:
+                private = process_private_bytes(worker.process.pid)
+                used = None if private is None else private - worker.memory_base.value
+                if used is not None and used > self.memory_limit:
+                    worker.future = None
+                    future.set_exception(MetisResourceError(
+                        f"Trial allocated {used / 1024 ** 2:.0f} MB, over its memory limit of "
+                        f"{self.memory_limit / 1024 ** 2:.0f} MB, and was killed"
+                    ))
+                    self._replace(index)
+        
+        self._dispatch()
+    
+    def wait(self, futures: Iterable[Future], return_when: str = FIRST_COMPLETED) -> Tuple[Set[Future], Set[Future]]:
+        """Drive the pool until some or all of the given futures are done.
+        
+        Returns:
+            Tuple of (done, not_done) sets, like concurrent.futures.wait
+        """
+        futures = set(futures)
+        while True:
+            done = {future for future in futures if future.done()}
+            if (return_when == FIRST_COMPLETED and done) or len(done) == len(futures):
+                return done, futures - done
+            self._poll()
+    
+    def shutdown(self):
+        """Stop the workers and remove the shared data files."""
+        for future, *_ in self._queue:
+            future.cancel()
+        self._queue.clear()
+        for worker in self._workers:
+            if worker is not None:
+                worker.stop(kill=worker.future is not None)
+        self._workers = []
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+    
+    def __enter__(self) -> 'TrialPool':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
@@ -0,0 +1,131 @@
+"""CPU budget shared by concurrently running trials."""
+
+import os
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
+
+from threadpoolctl import threadpool_limits
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Address space reserved per thread beyond what it allocates: a glibc malloc arena (64 MB) and a stack (8 MB)
+THREAD_ADDRESS_SPACE_BYTES = 72 * 1024 ** 2
+
+# Read by BLAS/OpenMP runtimes that start after the limit is set (e.g. in child processes)
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                   'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS']
+
+
+def available_cores() -> List[int]:
+    """CPUs this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class ThreadBudget:
+    """Splits a fixed number of cores between concurrently running trials.
+
+    Slot i of n_slots gets n_cores // n_slots threads and the first
+    n_cores % n_slots slots one more, so the allotments add up to n_cores
+    exactly (every slot gets at least one). With pin_cpus each slot also
+    gets its own set of CPUs to pin its process to (Linux only).
+    """
+
+    def __init__(self, n_cores: Optional[int] = None, n_slots: int = 1, pin_cpus: bool = False):
+        cores = available_cores()
+        self.n_cores = n_cores or len(cores)
+        self.n_slots = max(1, n_slots)
+        self.pin_cpus = pin_cpus and hasattr(os, 'sched_setaffinity')
+        if pin_cpus and not self.pin_cpus:
+            logger.warning("CPU pinning is not supported on this platform; ignoring pin_cpus")
+        self._cores = cores[:self.n_cores]
+
+    def threads(self, slot: int) -> int:
+        """Number of threads a trial in the given slot may use."""
+        base, extra = divmod(self.n_cores, self.n_slots)
+        return max(1, base + (1 if slot < extra else 0))
+
+    def cpus(self, slot: int) -> Optional[List[int]]:
+        """CPUs the given slot is pinned to, or None without pinning."""
+        if not self.pin_cpus or not self._cores:
+            return None
+        start = sum(self.threads(other) for other in range(slot)) % len(self._cores)
+        return sorted({self._cores[(start + offset) % len(self._cores)] for offset in range(self.threads(slot))})
+
+
+def process_private_bytes(pid: int) -> Optional[int]:
+    """Memory a process has written to and shares with no other process, or None without /proc.
+    
+    Unlike the resident set size, this leaves out pages a forked worker
+    still shares with its parent and clean pages of memory-mapped files
+    (the dataset), so it measures what the process itself allocated.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as rollup:
+            for line in rollup:
+                if line.startswith('Private_Dirty:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def memory_limit_supported() -> bool:
+    """Whether worker memory can be measured (Linux /proc)."""
+    return process_private_bytes(os.getpid()) is not None
+
+
+def limit_address_space(extra_bytes: int, n_threads: int = 1):
+    """Cap the current process's address space at its current size plus extra_bytes.
+    
+    Allocations past the cap fail at once with MemoryError, which a parent
+    polling memory use could not stop in time. Each thread may reserve
+    THREAD_ADDRESS_SPACE_BYTES without using it, so that much is allowed
+    per thread on top. The cap can be reset before every trial, as only
+    the soft limit is lowered.
+    """
+    try:
+        import resource
+        with open('/proc/self/statm') as statm:
+            size = int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        soft = size + extra_bytes + n_threads * THREAD_ADDRESS_SPACE_BYTES
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+    except (ImportError, OSError, ValueError) as e:
+        logger.warning(f"Could not limit the address space of worker {os.getpid()}: {e}")
+
+
+@contextmanager
+def single_threaded(estimators: List[Any]) -> Iterator[None]:
+    """Run BLAS/OpenMP and the estimators' own n_jobs on one thread, restoring n_jobs afterwards.
+    
+    For callers that parallelize over many calls into the estimators, so
+    that their threads, not the estimators', use the core budget.
+    """
+    previous = []
+    for estimator in estimators:
+        if 'n_jobs' in getattr(estimator, 'get_params', dict)():
+            previous.append((estimator, estimator.get_params()['n_jobs']))
+            estimator.set_params(n_jobs=1)
+    try:
+        with threadpool_limits(limits=1):
+            yield
+    finally:
+        for estimator, n_jobs in previous:
+            estimator.set_params(n_jobs=n_jobs)
+
+
+def limit_threads(n_threads: int, cpus: Optional[List[int]] = None):
+    """Cap the BLAS/OpenMP thread pools of the current process, optionally pinning it to cpus."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(n_threads)
+    threadpool_limits(limits=n_threads)
+    if cpus:
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            logger.warning(f"Could not pin worker to CPUs {cpus}: {e}")
@@ -0,0 +1,129 @@
+"""Single-pass, vectorized scoring of fitted models."""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.stats import rankdata
+from sklearn.base import BaseEstimator
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+from sklearn.linear_model import LogisticRegression
+import xgboost as xgb
+
+CLASSIFICATION_METRICS = ['accuracy', 'f1', 'precision', 'recall', 'roc_auc']
+REGRESSION_METRICS = ['r2', 'mse', 'mae']
+
+# Classifiers whose predict() is the argmax of predict_proba(), so one call gives both
+_ARGMAX_CLASSIFIERS = (RandomForestClassifier, ExtraTreesClassifier, LogisticRegression, xgb.XGBClassifier)
+
+
+def predict_split(model: BaseEstimator, X, is_classification: bool,
+                  classes: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Run inference once and return (labels or values, float32 prediction matrix).
+
+    For classifiers the matrix holds probabilities with columns in the order
+    of classes (one-hot rows for models without predict_proba); for
+    regressors it is the float32 prediction vector.
+    """
+    if not is_classification:
+        values = np.asarray(model.predict(X), dtype=np.float64)
+        return values, values.astype(np.float32)
+
+    from metis.core.ensemble import EnsembleModel
+
+    matrix = np.zeros((X.shape[0], len(classes)), dtype=np.float32)
+    if hasattr(model, 'predict_proba'):
+        proba = model.predict_proba(X)
+        model_classes = getattr(model, 'classes_', classes)
+        matrix[:, np.searchsorted(classes, model_classes)] = proba
+        if isinstance(model, _ARGMAX_CLASSIFIERS + (EnsembleModel,)):
+            labels = classes[np.argmax(matrix, axis=1)]
+        else:
+            labels = np.asarray(model.predict(X))
+    else:
+        labels = np.asarray(model.predict(X))
+        codes = np.searchsorted(classes, labels)
+        known = (codes < len(classes)) & (classes[np.minimum(codes, len(classes) - 1)] == labels)
+        matrix[np.flatnonzero(known), codes[known]] = 1.0
+    return labels, matrix
+
+
+def _binary_auc(positive: np.ndarray, scores: np.ndarray) -> float:
+    """Mann-Whitney AUC with average ranks for ties."""
+    n_pos = int(positive.sum())
+    n_neg = len(positive) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return float('nan')
+    ranks = rankdata(scores)
+    return float((ranks[positive].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+def _roc_auc(y_true: np.ndarray, matrix: np.ndarray, classes: np.ndarray) -> float:
+    """Binary AUC on the second class, or the macro one-vs-rest AUC for multiclass."""
+    if len(classes) == 2:
+        auc = _binary_auc(y_true == classes[1], matrix[:, 1])
+    else:
+        aucs = [_binary_auc(y_true == label, matrix[:, i]) for i, label in enumerate(classes)]
+        aucs = [auc for auc in aucs if not np.isnan(auc)]
+        auc = float(np.mean(aucs)) if aucs else float('nan')
+    return 0.0 if np.isnan(auc) else auc
+
+
+def compute_metrics(y_true, y_pred: np.ndarray, matrix: Optional[np.ndarray],
+                    metrics: List[str], is_classification: bool,
+                    classes: Optional[np.ndarray] = None) -> Dict[str, float]:
+    """Compute several metrics from one set of predictions.
+
+    Precision, recall and F1 are support-weighted averages with zero for
+    undefined ratios. Error metrics (mse, mae) are negated so that higher is
+    better for every metric, as for validation_score.
+    """
+    y_true = np.asarray(y_true)
+    scores = {}
+
+    if not is_classification:
+        y_true = y_true.astype(np.float64)
+        errors = y_true - y_pred
+        for metric in metrics:
+            if metric == 'mse':
+                scores[metric] = -float(np.mean(errors ** 2))
+            elif metric == 'mae':
+                scores[metric] = -float(np.mean(np.abs(errors)))
+            elif metric == 'r2':
+                total = np.sum((y_true - y_true.mean()) ** 2)
+                residual = np.sum(errors ** 2)
+                scores[metric] = float(1 - residual / total) if total > 0 else (1.0 if residual == 0 else 0.0)
+        return scores
+
+    labels = np.unique(np.concatenate([y_true, y_pred]))
+    true_codes = np.searchsorted(labels, y_true)
+    pred_codes = np.searchsorted(labels, y_pred)
+    confusion = np.bincount(
+        true_codes * len(labels) + pred_codes, minlength=len(labels) ** 2
+    ).reshape(len(labels), len(labels))
+
+    true_positives = np.diag(confusion).astype(np.float64)
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    weights = support / support.sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, true_positives / predicted, 0.0)
+        recall = np.where(support > 0, true_positives / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+    for metric in metrics:
+        if metric == 'accuracy':
+            scores[metric] = float(true_positives.sum() / len(y_true))
+        elif metric == 'precision':
+            scores[metric] = float(weights @ precision)
+        elif metric == 'recall':
+            scores[metric] = float(weights @ recall)
+        elif metric == 'f1':
+            scores[metric] = float(weights @ f1)
+        elif metric == 'roc_auc':
+            scores[metric] = _roc_auc(y_true, matrix, classes) if matrix is not None else 0.0
+    return scores
+
+
+def task_metrics(is_classification: bool) -> List[str]:
+    """All metrics available for a task type."""
+    return CLASSIFICATION_METRICS if is_classification else REGRESSION_METRICS
@@ -59,6 +59,11 @@ class SearchSpace:
         """Encode list of selected feature names to binary mask."""
         return [feature in selected_features for feature in self.feature_names]
     
+    def prefix_feature_mask(self, ranking: List[int], num_selected: int) -> List[bool]:
+        """Build a mask selecting the first num_selected features of a ranking."""
+        selected = set(ranking[:num_selected])
+        return [i in selected for i in range(self.num_features)]
+    
     def sample_random_config(self) -> Dict[str, Any]:
         """Sample a random candidate configuration."""
         num_selected = np.random.randint(1, min(self.max_features + 1, self.num_features + 1))
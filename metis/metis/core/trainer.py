@@ -1,29 +1,213 @@
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Optional, Union
 import pandas as pd
 import numpy as np
+import copy
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from sklearn.base import BaseEstimator
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+import xgboost as xgb
 from metis.models.model_factory import create_model
-from metis.utils.feature_engineering import select_features
-from metis.exceptions import MetisTrainingError
+from metis.models.approximate_svm import ApproximateSVM
+from metis.core.ensemble import EnsembleModel
+from metis.core.scoring import predict_split, compute_metrics, task_metrics
+from metis.exceptions import MetisTrainingError, MetisResourceError
+
+
+Matrix = Union[pd.DataFrame, np.ndarray]
+
+# Hyperparameter whose smaller grid values can be scored from one fit, per built-in model
+PATH_PARAMS = {
+    'random_forest': 'n_estimators',
+    'xgboost': 'n_estimators',
+    'logistic_regression': 'C',
+}
+
+
+def to_matrix(X: Matrix, dtype: Optional[np.dtype] = None) -> np.ndarray:
+    """Convert features to a C-contiguous numpy array, without copying arrays that already are one.
+    
+    DataFrames default to float64; arrays keep their dtype unless one is given.
+    """
+    if isinstance(X, pd.DataFrame):
+        return np.ascontiguousarray(X.to_numpy(dtype=dtype or np.float64))
+    return np.ascontiguousarray(X, dtype=dtype)
 
 
 class ModelTrainer:
-    """Handles model training and evaluation."""
-    
-    def __init__(self, X_train: pd.DataFrame, X_val: pd.DataFrame, 
-                 y_train: pd.Series, y_val: pd.Series, is_classification: bool):
-        self.X_train = X_train
-        self.X_val = X_val
-        self.y_train = y_train
-        self.y_val = y_val
+    """Handles model training and evaluation.
+    
+    The splits are converted once to contiguous numpy arrays (float32 with
+    dtype=np.float32) and models are fitted on those. Feature masks map to
+    cached integer column indices, so per-trial data preparation is a single
+    numpy take, or no copy at all when every feature is selected.
+    
+    XGBoost models with tree_method='hist' are fitted on a QuantileDMatrix
+    cached per (feature mask, rows, max_bin), so repeated trials on the same
+    features skip quantization. At most dmatrix_cache_size matrices are kept.
+    
+    With path_grids (model name -> grid of its PATH_PARAMS hyperparameter),
+    full-split fits of random forests and XGBoost are also scored at every
+    smaller n_estimators in the grid: forests keep a prefix of their trees
+    and XGBoost a prefix of its boosting rounds, which equals fitting that
+    size from scratch. Logistic regression / Ridge fits sweep every C in the
+    grid (plus the config's own) in one pass, warm-starting each solve from
+    the previous coefficients, or from one SVD for Ridge. The extra points
+    are returned under metrics['path'].
+    
+    SVM trials on more than svm_max_rows training rows use an ApproximateSVM;
+    their metrics name the approximation under 'approximation'.
+    
+    n_jobs is the number of threads a trial may use; in cross-validation it
+    is shared between the fold_jobs folds fitted at once.
+    """
+    
+    def __init__(self, X_train: Matrix, X_val: Matrix, 
+                 y_train: pd.Series, y_val: pd.Series, is_classification: bool,
+                 folds: Optional[List[Tuple[np.ndarray, np.ndarray]]] = None,
+                 fold_jobs: int = 1, train_scoring: str = 'final',
+                 train_sample_size: int = 1000, dtype: Optional[np.dtype] = None,
+                 feature_names: Optional[List[str]] = None, dmatrix_cache_size: int = 8,
+                 path_grids: Optional[Dict[str, List[Any]]] = None,
+                 svm_max_rows: Optional[int] = None, n_jobs: Optional[int] = None):
+        if isinstance(X_train, pd.DataFrame):
+            feature_names = list(X_train.columns)
+        self.feature_names = list(feature_names) if feature_names is not None else list(range(X_train.shape[1]))
+        self.X_train = to_matrix(X_train, dtype)
+        self.X_val = to_matrix(X_val, self.X_train.dtype)
+        self.y_train = np.asarray(y_train)
+        self.y_val = np.asarray(y_val)
+        self._feature_indices: Dict[Tuple[bool, ...], np.ndarray] = {}
+        self._dmatrices: 'OrderedDict[Tuple, xgb.QuantileDMatrix]' = OrderedDict()
+        self._dmatrix_lock = threading.Lock()
+        self.dmatrix_cache_size = dmatrix_cache_size
+        self.path_grids = path_grids or {}
+        self.svm_max_rows = svm_max_rows
+        self.n_jobs = n_jobs
         self.is_classification = is_classification
+        self.classes = np.unique(y_train) if is_classification else None
+        self.folds = folds
+        self.fold_jobs = fold_jobs
+        # 'full' scores every trial on the whole training split, 'subsample' on a fixed
+        # sample of it, 'final' leaves train_score to be computed for the best model only
+        self.train_scoring = train_scoring
+        self.train_sample_size = train_sample_size
+        self.train_sample = None
+        if train_scoring == 'subsample' and len(y_train) > train_sample_size:
+            rng = np.random.RandomState(42)
+            self.train_sample = np.sort(rng.choice(len(y_train), size=train_sample_size, replace=False))
+    
+    def feature_indices(self, feature_mask: List[bool]) -> np.ndarray:
+        """Integer column indices of a feature mask (cached per mask)."""
+        key = tuple(bool(selected) for selected in feature_mask)
+        indices = self._feature_indices.get(key)
+        if indices is None:
+            indices = np.flatnonzero(key).astype(np.intp)
+            self._feature_indices[key] = indices
+        return indices
+    
+    def _select(self, X: np.ndarray, feature_mask: List[bool],
+                rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rows and masked columns of a matrix, as a view when no gather is needed."""
+        columns = self.feature_indices(feature_mask)
+        if len(columns) == X.shape[1]:
+            return X if rows is None else X[rows]
+        if rows is None:
+            return np.take(X, columns, axis=1)
+        return X[np.ix_(rows, columns)]
+    
+    def _quantile_matrix(self, model: xgb.XGBModel, X: np.ndarray, y: np.ndarray,
+                         feature_mask: List[bool], rows: Optional[np.ndarray]) -> xgb.QuantileDMatrix:
+        """Cached QuantileDMatrix of the given training rows and features."""
+        key = (
+            tuple(self.feature_indices(feature_mask)),
+            None if rows is None else (len(rows), hash(np.asarray(rows).tobytes())),
+            model.max_bin or 256,
+        )
+        with self._dmatrix_lock:
+            dtrain = self._dmatrices.get(key)
+            if dtrain is not None:
+                self._dmatrices.move_to_end(key)
+                return dtrain
+        dtrain = xgb.QuantileDMatrix(X, label=y, max_bin=model.max_bin, nthread=model.n_jobs)
+        with self._dmatrix_lock:
+            self._dmatrices[key] = dtrain
+            while len(self._dmatrices) > self.dmatrix_cache_size:
+                self._dmatrices.popitem(last=False)
+        return dtrain
+    
+    def _fit(self, model: BaseEstimator, X: np.ndarray, y: np.ndarray,
+             feature_mask: List[bool], rows: Optional[np.ndarray] = None):
+        """Fit a model, reusing the cached QuantileDMatrix for histogram XGBoost models.
+        
+        Such models are trained with xgb.train on the cached matrix and the
+        booster is loaded into the sklearn wrapper, so only public XGBoost API
+        is used. Anything the wrapper's own fit handles specially (custom
+        objectives, callbacks, early stopping, labels other than 0..k-1) is
+        fitted normally.
+        """
+        params = self._train_params(model, y) if isinstance(model, xgb.XGBModel) else None
+        if params is None:
+            model.fit(X, y)
+            return
+        dtrain = self._quantile_matrix(model, X, y, feature_mask, rows)
+        booster = xgb.train(params, dtrain, model.get_num_boosting_rounds())
+        model.load_model(bytearray(booster.save_raw(raw_format='ubj')))
+    
+    @staticmethod
+    def _train_params(model: xgb.XGBModel, y: np.ndarray) -> Optional[Dict[str, Any]]:
+        """xgb.train parameters equivalent to model.fit(X, y), or None if there are none."""
+        if not (model.tree_method == 'hist' and model.booster in (None, 'gbtree', 'dart')):
+            return None
+        if callable(model.objective) or model.callbacks or model.early_stopping_rounds \
+                or model.eval_metric:
+            return None
+        params = model.get_xgb_params()
+        if isinstance(model, xgb.XGBClassifier):
+            classes = np.unique(y)
+            if not np.array_equal(classes, np.arange(len(classes))):
+                return None
+            if len(classes) > 2:
+                if params.get('objective') != 'multi:softmax':
+                    params['objective'] = 'multi:softprob'
+                params['num_class'] = len(classes)
+        return params
     
-    def train_and_evaluate(self, config: Dict[str, Any], metric: str) -> Tuple[float, BaseEstimator, Dict[str, float]]:
+    def transform(self, X: pd.DataFrame, feature_mask: List[bool]) -> np.ndarray:
+        """Convert another split (e.g. test) to the masked training layout."""
+        return self._select(to_matrix(X, self.X_train.dtype), feature_mask)
+    
+    def _create_model(self, config: Dict[str, Any], exact: bool = False) -> BaseEstimator:
+        """Model for a config, approximated for large splits unless exact is set.
+        
+        The size of the full training split decides, so every fidelity and
+        fold of a trial uses the same kind of model.
+        """
+        n_jobs = self.n_jobs
+        if n_jobs is not None and self.folds:
+            n_jobs = max(1, n_jobs // max(1, min(self.fold_jobs, len(self.folds))))
+        return create_model(
+            config['model'], config['hyperparameters'], self.is_classification,
+            n_samples=len(self.y_train), svm_max_rows=None if exact else self.svm_max_rows,
+            n_jobs=n_jobs
+        )
+    
+    def train_and_evaluate(self, config: Dict[str, Any], metric: str,
+                           row_indices: Optional[np.ndarray] = None,
+                           incumbent: Optional[float] = None,
+                           exact: bool = False) -> Tuple[float, BaseEstimator, Dict[str, float]]:
         """Train a model with given configuration and return validation score.
         
         Args:
             config: Configuration dictionary with model, hyperparameters, and feature_mask
             metric: Metric to use for evaluation
+            row_indices: Optional positional indices of training rows to fit on
+                (used for low-fidelity evaluations). Defaults to the full training split.
+            incumbent: Best validation score so far; in cross-validation mode the
+                remaining folds are skipped once the finished ones are clearly worse
+            exact: Fit an exact kernel SVM whatever the size of the training split
         
         Returns:
             Tuple of (validation_score, trained_model, metrics_dict)
@@ -31,105 +215,297 @@ class ModelTrainer:
         Raises:
             MetisTrainingError: If training fails
         """
+        if self.folds:
+            return self._cross_validate(config, metric, row_indices, incumbent, exact)
+        
         try:
             feature_mask = config['feature_mask']
-            X_train_selected, selected_features = select_features(
-                self.X_train, self.y_train, feature_mask=feature_mask
-            )
-            X_val_selected, _ = select_features(
-                self.X_val, self.y_val, feature_mask=feature_mask
+            y_train = self.y_train if row_indices is None else self.y_train[row_indices]
+            X_train_selected = self._select(self.X_train, feature_mask, row_indices)
+            X_val_selected = self._select(self.X_val, feature_mask)
+            
+            use_path = row_indices is None and config['model'] in self.path_grids
+            param = PATH_PARAMS.get(config['model'])
+            
+            fit_started = time.perf_counter()
+            if use_path and param == 'C':
+                model, path_models = self._regularization_path(config, X_train_selected, y_train, exact)
+            else:
+                model = self._create_model(config, exact)
+                self._fit(model, X_train_selected, y_train, feature_mask, row_indices)
+                path_models = self._prefix_models(config, model) if use_path else []
+            fit_seconds = time.perf_counter() - fit_started
+            
+            val_score, metrics = self._evaluate_fitted(
+                model, X_train_selected, y_train, X_val_selected, metric, fit_seconds, row_indices
             )
+            if use_path:
+                metrics['path'] = [
+                    self._path_point(
+                        config, param, value, path_model,
+                        X_train_selected, y_train, X_val_selected, metric
+                    )
+                    for value, path_model in path_models
+                ]
+            if isinstance(model, ApproximateSVM):
+                metrics['approximation'] = model.approximation
             
-            model = create_model(
-                config['model'],
-                config['hyperparameters'],
-                self.is_classification
+            return val_score, model, metrics
+        except Exception as e:
+            if isinstance(e, MetisTrainingError):
+                raise
+            if isinstance(e, MemoryError):
+                raise MetisResourceError(f"Out of memory while training: {str(e)}") from e
+            raise MetisTrainingError(f"Failed to train model: {str(e)}") from e
+    
+    def _evaluate_fitted(self, model: BaseEstimator, X_train: np.ndarray, y_train: np.ndarray,
+                         X_val: np.ndarray, metric: str, fit_seconds: Optional[float],
+                         row_indices: Optional[np.ndarray] = None) -> Tuple[float, Dict[str, Any]]:
+        """Validation score and metrics dict of a fitted model."""
+        train_score = self._train_score(model, X_train, y_train, metric, row_indices)
+        val_metrics, val_predictions = self._score_split(
+            model, X_val, self.y_val, task_metrics(self.is_classification)
+        )
+        val_score = val_metrics[self._scoring_metric(metric)]
+        
+        metrics = {
+            'train_score': train_score,
+            'validation_score': val_score,
+            'validation_metrics': val_metrics,
+            'fit_seconds': fit_seconds,
+            # float32 predictions kept for ensemble selection; popped before metrics are reported
+            'validation_predictions': val_predictions,
+        }
+        return val_score, metrics
+    
+    def _path_point(self, config: Dict[str, Any], param: str, value: Any, model: BaseEstimator,
+                    X_train: np.ndarray, y_train: np.ndarray, X_val: np.ndarray,
+                    metric: str) -> Dict[str, Any]:
+        """Score one extra point of a path.
+        
+        Returns:
+            Dict with 'hyperparameters', 'score', 'model' and 'metrics' (fit_seconds
+            is None, as the point was not fitted on its own)
+        """
+        score, metrics = self._evaluate_fitted(model, X_train, y_train, X_val, metric, None)
+        return {
+            'hyperparameters': {**config['hyperparameters'], param: value},
+            'score': score,
+            'model': model,
+            'metrics': metrics,
+        }
+    
+    def _prefix_models(self, config: Dict[str, Any], model: BaseEstimator) -> List[Tuple[int, BaseEstimator]]:
+        """Prefixes of a fitted forest or booster for the smaller n_estimators grid values."""
+        size = config['hyperparameters'].get('n_estimators')
+        if size is None:
+            return []
+        if isinstance(model, xgb.XGBModel) and model.booster == 'dart':
+            # Dropout rescales earlier trees, so a prefix is not a smaller model
+            return []
+        
+        models = []
+        for value in sorted({int(v) for v in self.path_grids[config['model']] if v is not None and v < size}):
+            truncated = self._truncate(model, value)
+            if truncated is None:
+                break
+            models.append((value, truncated))
+        return models
+    
+    def _regularization_path(self, config: Dict[str, Any], X: np.ndarray, y: np.ndarray,
+                             exact: bool = False) -> Tuple[BaseEstimator, List[Tuple[float, BaseEstimator]]]:
+        """Fit every C of the grid and the config's own, from strongest regularization up.
+        
+        Estimators come from _create_model with only C overridden, so they get
+        the trial's thread allotment like any other fit.
+        
+        Returns:
+            Tuple of (model for the config's C, [(C, model) for the other values])
+        """
+        own = config['hyperparameters']['C']
+        values = sorted({float(v) for v in self.path_grids[config['model']] if v is not None} | {float(own)})
+        
+        def with_c(value: float) -> BaseEstimator:
+            return self._create_model(
+                {**config, 'hyperparameters': {**config['hyperparameters'], 'C': value}}, exact
             )
+        
+        models = []
+        if self.is_classification:
+            # Solvers other than liblinear start each fit from the previous coefficients
+            estimator = with_c(values[0])
+            estimator.set_params(warm_start=True)
+            for value in values:
+                estimator.set_params(C=value)
+                estimator.fit(X, y)
+                fitted = copy.deepcopy(estimator)
+                fitted.set_params(warm_start=False)
+                models.append(fitted)
+        else:
+            # Ridge solutions for every alpha from one SVD of the centered training matrix
+            X = np.asarray(X, dtype=np.float64)
+            y = np.asarray(y, dtype=np.float64)
+            X_mean, y_mean = X.mean(axis=0), y.mean()
+            U, s, Vt = np.linalg.svd(X - X_mean, full_matrices=False)
+            Uty = U.T @ (y - y_mean)
+            for value in values:
+                estimator = with_c(value)
+                estimator.coef_ = Vt.T @ (s / (s ** 2 + estimator.alpha) * Uty)
+                estimator.intercept_ = y_mean - X_mean @ estimator.coef_
+                estimator.n_features_in_ = X.shape[1]
+                models.append(estimator)
+        
+        own_index = values.index(float(own))
+        path = [(value, model) for i, (value, model) in enumerate(zip(values, models)) if i != own_index]
+        return models[own_index], path
+    
+    @staticmethod
+    def _truncate(model: BaseEstimator, n_estimators: int) -> Optional[BaseEstimator]:
+        """Copy of a fitted forest or booster keeping its first n_estimators trees or rounds."""
+        truncated = copy.copy(model)
+        if isinstance(model, (RandomForestClassifier, RandomForestRegressor)):
+            truncated.estimators_ = model.estimators_[:n_estimators]
+        elif isinstance(model, xgb.XGBModel):
+            truncated._Booster = model.get_booster()[:n_estimators]
+        else:
+            return None
+        truncated.n_estimators = n_estimators
+        return truncated
+    
+    def _cross_validate(self, config: Dict[str, Any], metric: str,
+                        row_indices: Optional[np.ndarray] = None,
+                        incumbent: Optional[float] = None,
+                        exact: bool = False) -> Tuple[float, BaseEstimator, Dict[str, float]]:
+        """Score a configuration by K-fold cross-validation on the training split.
+        
+        Folds are fitted on up to fold_jobs threads. The fold models are kept
+        as an equally weighted EnsembleModel, so no refit on the full split is
+        needed; the validation split stays a holdout for that ensemble.
+        
+        If incumbent is given and the mean of the finished folds plus two
+        standard deviations is below it, folds not yet started are cancelled
+        and the metrics are marked 'cv_aborted' (the model is then None).
+        """
+        try:
+            feature_mask = config['feature_mask']
+            X_val_selected = self._select(self.X_val, feature_mask)
+            selected_features = [self.feature_names[i] for i in self.feature_indices(feature_mask)]
             
-            model.fit(X_train_selected, self.y_train)
+            def fit_fold(fold: int):
+                train_rows, val_rows = self.folds[fold]
+                if row_indices is not None:
+                    train_rows = np.intersect1d(train_rows, row_indices, assume_unique=True)
+                model = self._create_model(config, exact)
+                fit_started = time.perf_counter()
+                self._fit(
+                    model, self._select(self.X_train, feature_mask, train_rows),
+                    self.y_train[train_rows], feature_mask, train_rows
+                )
+                fit_seconds = time.perf_counter() - fit_started
+                score = self._compute_score(
+                    model, self._select(self.X_train, feature_mask, val_rows), self.y_train[val_rows], metric
+                )
+                return model, score, fit_seconds
             
-            train_score = self._compute_score(model, X_train_selected, self.y_train, metric)
-            val_score = self._compute_score(model, X_val_selected, self.y_val, metric)
+            models, scores, fit_seconds = [], [], 0.0
+            aborted = False
+            with ThreadPoolExecutor(max_workers=max(1, min(self.fold_jobs, len(self.folds)))) as executor:
+                futures = [executor.submit(fit_fold, fold) for fold in range(len(self.folds))]
+                for future in as_completed(futures):
+                    model, score, seconds = future.result()
+                    models.append(model)
+                    scores.append(score)
+                    fit_seconds += seconds
+                    if incumbent is not None and len(scores) < len(self.folds) and \
+                            len(scores) >= 2 and np.mean(scores) + 2 * np.std(scores) < incumbent:
+                        aborted = True
+                        for pending in futures:
+                            pending.cancel()
+                        break
             
-            feature_importance = self._get_feature_importance(model, selected_features)
+            cv_score = float(np.mean(scores))
+            approximation = {'approximation': models[0].approximation} \
+                if isinstance(models[0], ApproximateSVM) else {}
+            if aborted:
+                return cv_score, None, {
+                    'validation_score': cv_score,
+                    'cv_scores': scores,
+                    'cv_aborted': True,
+                    'fit_seconds': fit_seconds,
+                    **approximation,
+                }
+            
+            model = EnsembleModel(
+                models, [1.0 / len(models)] * len(models),
+                [selected_features] * len(models),
+                self.is_classification, self.classes
+            )
+            train_score = None
+            if self.train_scoring != 'final':
+                train_score = self._train_score(
+                    model, self._select(self.X_train, feature_mask), self.y_train, metric
+                )
+            holdout_metrics, val_predictions = self._score_split(
+                model, X_val_selected, self.y_val, task_metrics(self.is_classification)
+            )
             
             metrics = {
                 'train_score': train_score,
-                'validation_score': val_score,
-                'feature_importance': feature_importance,
+                'validation_score': cv_score,
+                'holdout_score': holdout_metrics[self._scoring_metric(metric)],
+                'holdout_metrics': holdout_metrics,
+                'cv_scores': scores,
+                'fit_seconds': fit_seconds,
+                'validation_predictions': val_predictions,
+                **approximation,
             }
-            
-            return val_score, model, metrics
+            return cv_score, model, metrics
         except Exception as e:
             if isinstance(e, MetisTrainingError):
                 raise
+            if isinstance(e, MemoryError):
+                raise MetisResourceError(f"Out of memory while training: {str(e)}") from e
             raise MetisTrainingError(f"Failed to train model: {str(e)}") from e
     
-    def _compute_score(self, model: BaseEstimator, X: pd.DataFrame, y: pd.Series, metric: str) -> float:
-        """Compute score based on metric."""
-        from sklearn.metrics import (
-            accuracy_score, f1_score, precision_score, recall_score,
-            roc_auc_score, r2_score, mean_squared_error, mean_absolute_error
-        )
+    def _score_split(self, model: BaseEstimator, X: Matrix, y: np.ndarray,
+                     metrics: List[str]) -> Tuple[Dict[str, float], np.ndarray]:
+        """Run inference once on a split and compute several metrics from it.
         
+        Returns:
+            Tuple of (metric name -> score, float32 prediction matrix)
+        """
         try:
-            y_pred = model.predict(X)
-            
-            if self.is_classification:
-                if metric == 'accuracy':
-                    return accuracy_score(y, y_pred)
-                elif metric == 'f1':
-                    return f1_score(y, y_pred, average='weighted')
-                elif metric == 'precision':
-                    return precision_score(y, y_pred, average='weighted', zero_division=0)
-                elif metric == 'recall':
-                    return recall_score(y, y_pred, average='weighted', zero_division=0)
-                elif metric == 'roc_auc':
-                    try:
-                        if hasattr(model, 'predict_proba'):
-                            y_pred_proba = model.predict_proba(X)[:, 1]
-                            return roc_auc_score(y, y_pred_proba)
-                        else:
-                            return 0.0
-                    except:
-                        return 0.0
-                else:
-                    return accuracy_score(y, y_pred)
-            else:
-                if metric == 'r2':
-                    return r2_score(y, y_pred)
-                elif metric == 'mse':
-                    return -mean_squared_error(y, y_pred)
-                elif metric == 'mae':
-                    return -mean_absolute_error(y, y_pred)
-                else:
-                    return r2_score(y, y_pred)
+            y_pred, matrix = predict_split(model, X, self.is_classification, self.classes)
+            scores = compute_metrics(y, y_pred, matrix, metrics, self.is_classification, self.classes)
+            return scores, matrix
         except Exception as e:
+            if isinstance(e, MemoryError):
+                raise MetisResourceError(f"Out of memory while scoring: {str(e)}") from e
             raise MetisTrainingError(f"Failed to compute score: {str(e)}") from e
     
-    def _get_feature_importance(self, model: BaseEstimator, feature_names: List[str]) -> Dict[str, float]:
-        """Extract feature importance from model."""
-        importance_dict = {}
-        
-        try:
-            if hasattr(model, 'feature_importances_'):
-                importances = model.feature_importances_
-                for i, feature in enumerate(feature_names):
-                    importance_dict[feature] = float(importances[i])
-            elif hasattr(model, 'coef_'):
-                coef = model.coef_
-                if coef.ndim > 1:
-                    coef = np.abs(coef[0])
-                else:
-                    coef = np.abs(coef)
-                for i, feature in enumerate(feature_names):
-                    importance_dict[feature] = float(coef[i])
-            else:
-                for feature in feature_names:
-                    importance_dict[feature] = 1.0 / len(feature_names)
-        except Exception:
-            for feature in feature_names:
-                importance_dict[feature] = 1.0 / len(feature_names)
+    def _train_score(self, model: BaseEstimator, X: np.ndarray, y: np.ndarray, metric: str,
+                     row_indices: Optional[np.ndarray] = None) -> Optional[float]:
+        """Training-split score according to train_scoring (None if it is deferred).
         
-        return importance_dict
+        In 'subsample' mode, low-fidelity fits (row_indices given) are not scored.
+        """
+        if self.train_scoring == 'final':
+            return None
+        if self.train_scoring == 'subsample':
+            if row_indices is not None:
+                return None
+            if self.train_sample is not None:
+                X, y = X[self.train_sample], y[self.train_sample]
+        return self._compute_score(model, X, y, metric)
+    
+    def _scoring_metric(self, metric: str) -> str:
+        """The metric itself, or the task default (accuracy / r2) if it does not apply."""
+        if metric in task_metrics(self.is_classification):
+            return metric
+        return 'accuracy' if self.is_classification else 'r2'
+    
+    def _compute_score(self, model: BaseEstimator, X: Matrix, y: np.ndarray, metric: str) -> float:
+        """Compute score based on metric."""
+        metric = self._scoring_metric(metric)
+        return self._score_split(model, X, y, [metric])[0][metric]
 
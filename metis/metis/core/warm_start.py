@@ -0,0 +1,113 @@
+"""Local index of past runs for meta-learning warm starts."""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, Any, List
+
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MetaIndex:
+    """SQLite index mapping dataset meta-features to the best configs found on them.
+    
+    Configs are stored without dataset-specific feature masks: the selected
+    feature count is kept as a fraction of the columns so it can be applied
+    to the ranked features of a new table.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS runs ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL, '
+            'is_classification INTEGER NOT NULL, metric TEXT NOT NULL, '
+            'meta_features TEXT NOT NULL, configs TEXT NOT NULL)'
+        )
+        return conn
+    
+    def record(self, meta_features: Dict[str, float], is_classification: bool, metric: str,
+               configs: List[Dict[str, Any]]):
+        """Store the best configs of a finished run, best first.
+        
+        Args:
+            meta_features: Output of compute_meta_features
+            is_classification: Whether the run was a classification task
+            metric: Metric the run optimized
+            configs: Dicts with 'model', 'hyperparameters' and 'feature_fraction'
+        """
+        if not configs:
+            return
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    'INSERT INTO runs (created, is_classification, metric, meta_features, configs) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (time.time(), int(is_classification), metric,
+                     json.dumps(meta_features, sort_keys=True), json.dumps(configs, default=str))
+                )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to record run in meta index: {e}")
+    
+    def suggest(self, meta_features: Dict[str, float], is_classification: bool, metric: str,
+                num_configs: int = 5, num_neighbors: int = 3) -> List[Dict[str, Any]]:
+        """Return best configs of the most similar past runs, nearest run first.
+        
+        Distances are Euclidean over meta-features standardized across the
+        indexed runs. Configs are interleaved by rank so the best config of
+        each neighbour comes before any runner-up.
+        """
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    'SELECT meta_features, configs FROM runs WHERE is_classification = ? AND metric = ?',
+                    (int(is_classification), metric)
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read meta index: {e}")
+            return []
+        
+        if not rows:
+            return []
+        
+        keys = sorted(meta_features)
+        past = np.array([[json.loads(meta).get(key, 0.0) for key in keys] for meta, _ in rows])
+        current = np.array([meta_features[key] for key in keys])
+        
+        scale = past.std(axis=0)
+        scale[scale < 1e-9] = 1.0
+        distances = np.sqrt((((past - current) / scale) ** 2).sum(axis=1))
+        neighbors = np.argsort(distances, kind='stable')[:num_neighbors]
+        
+        neighbor_configs = [json.loads(rows[i][1]) for i in neighbors]
+        suggestions = []
+        seen = set()
+        for rank in range(max(len(configs) for configs in neighbor_configs)):
+            for configs in neighbor_configs:
+                if rank >= len(configs):
+                    continue
+                config = configs[rank]
+                key = json.dumps(config, sort_keys=True)
+                if key in seen:
+                    continue
+                seen.add(key)
+                suggestions.append(config)
+                if len(suggestions) >= num_configs:
+                    return suggestions
+        return suggestions
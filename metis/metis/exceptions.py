@@ -21,6 +21,16 @@ class MetisTrainingError(MetisError):
     pass
 
 
+class MetisTimeoutError(MetisTrainingError):
+    """Raised when a trial exceeds its time limit."""
+    pass
+
+
+class MetisResourceError(MetisTrainingError):
+    """Raised when a trial runs out of memory or exceeds its memory limit."""
+    pass
+
+
 class MetisQuantumError(MetisError):
     """Raised when quantum sampling fails."""
     pass
@@ -0,0 +1,79 @@
+"""Kernel-approximated SVMs for training sets too large for an exact kernel SVM."""
+
+from typing import Union
+
+import numpy as np
+from sklearn.base import BaseEstimator
+from sklearn.kernel_approximation import Nystroem
+from sklearn.svm import LinearSVC, LinearSVR
+
+
+class ApproximateSVM(BaseEstimator):
+    """Nystroem feature map followed by a linear SVM.
+
+    Stands in for SVC/SVR with the same C, kernel, gamma, degree, coef0 and
+    epsilon ('scale' and 'auto' gamma are resolved on the training data as sklearn
+    does), in time linear in the number of rows. The linear kernel needs no
+    feature map and is fitted by LinearSVC/LinearSVR directly.
+    """
+
+    def __init__(self, is_classification: bool = True, C: float = 1.0, kernel: str = 'rbf',
+                 gamma: Union[str, float] = 'scale', degree: int = 3, coef0: float = 0.0,
+                 epsilon: float = 0.1, n_components: int = 500, random_state: int = 42):
+        self.is_classification = is_classification
+        self.C = C
+        self.kernel = kernel
+        self.gamma = gamma
+        self.degree = degree
+        self.coef0 = coef0
+        self.epsilon = epsilon
+        self.n_components = n_components
+        self.random_state = random_state
+
+    @property
+    def approximation(self) -> str:
+        """How the kernel SVM is approximated ('nystroem', or 'linear' for the linear kernel)."""
+        return 'linear' if self.kernel == 'linear' else 'nystroem'
+
+    def _gamma(self, X: np.ndarray) -> float:
+        if self.gamma == 'scale':
+            variance = X.var()
+            return 1.0 / (X.shape[1] * variance) if variance > 0 else 1.0
+        if self.gamma == 'auto':
+            return 1.0 / X.shape[1]
+        return float(self.gamma)
+
+    def _transform(self, X: np.ndarray) -> np.ndarray:
+        return X if self.feature_map_ is None else self.feature_map_.transform(X)
+
+    def fit(self, X, y) -> 'ApproximateSVM':
+        X = np.asarray(X)
+        self.n_features_in_ = X.shape[1]
+        self.feature_map_ = None
+        if self.kernel != 'linear':
+            self.feature_map_ = Nystroem(
+                kernel=self.kernel, gamma=self._gamma(X), degree=self.degree, coef0=self.coef0,
+                n_components=min(self.n_components, X.shape[0]), random_state=self.random_state
+            ).fit(X)
+
+        features = self._transform(X)
+        if self.is_classification:
+            self.linear_ = LinearSVC(C=self.C, random_state=self.random_state).fit(features, y)
+            self.classes_ = self.linear_.classes_
+        else:
+            # SVR's epsilon-insensitive loss, so the approximation ranks like the exact SVR;
+            # it needs the dual solver, which converges slowly at the default max_iter
+            self.linear_ = LinearSVR(
+                C=self.C, epsilon=self.epsilon, loss='epsilon_insensitive', dual=True,
+                max_iter=10000, random_state=self.random_state
+            ).fit(features, y)
+        return self
+
+    def decision_function(self, X) -> np.ndarray:
+        return self.linear_.decision_function(self._transform(np.asarray(X)))
+
+    def predict(self, X) -> np.ndarray:
+        return self.linear_.predict(self._transform(np.asarray(X)))
+
+    def score(self, X, y) -> float:
+        return self.linear_.score(self._transform(np.asarray(X)), y)
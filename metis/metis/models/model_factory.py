@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.svm import SVC, SVR
 from sklearn.linear_model import LogisticRegression, Ridge
@@ -6,15 +6,23 @@ import xgboost as xgb
 
 from metis.exceptions import MetisTrainingError
 from metis.models.registry import get_registry
+from metis.models.approximate_svm import ApproximateSVM
 
 
-def create_model(model_name: str, hyperparameters: Dict[str, Any], is_classification: bool):
+def create_model(model_name: str, hyperparameters: Dict[str, Any], is_classification: bool,
+                 n_samples: Optional[int] = None, svm_max_rows: Optional[int] = None,
+                 n_jobs: Optional[int] = None):
     """Create a model instance based on name and hyperparameters.
     
     Args:
         model_name: Name of the model to create
         hyperparameters: Dictionary of hyperparameters
         is_classification: Whether this is a classification task
+        n_samples: Number of training rows, if known
+        svm_max_rows: Above this many training rows, 'svm' gives an ApproximateSVM
+            (Nystroem features and a linear SVM) instead of an exact SVC/SVR
+        n_jobs: Threads for models that train in parallel (random_forest, xgboost),
+            unless the hyperparameters set n_jobs themselves
     
     Returns:
         Trained sklearn-compatible model
@@ -29,6 +37,9 @@ def create_model(model_name: str, hyperparameters: Dict[str, Any], is_classifica
         if custom_model:
             return custom_model['creator'](hyperparameters, is_classification)
         
+        if model_name in ('random_forest', 'xgboost') and n_jobs is not None:
+            hyperparameters = {'n_jobs': n_jobs, **hyperparameters}
+        
         if model_name == 'random_forest':
             if is_classification:
                 return RandomForestClassifier(**hyperparameters, random_state=42)
@@ -36,21 +47,32 @@ def create_model(model_name: str, hyperparameters: Dict[str, Any], is_classifica
                 return RandomForestRegressor(**hyperparameters, random_state=42)
         
         elif model_name == 'xgboost':
+            # Histogram trees throughout, so the trainer's cached QuantileDMatrix applies
+            hyperparameters = {'tree_method': 'hist', **hyperparameters}
             if is_classification:
                 return xgb.XGBClassifier(**hyperparameters, random_state=42)
             else:
                 return xgb.XGBRegressor(**hyperparameters, random_state=42)
         
         elif model_name == 'svm':
+            if svm_max_rows is not None and n_samples is not None and n_samples > svm_max_rows:
+                return ApproximateSVM(is_classification, **hyperparameters, random_state=42)
             if is_classification:
                 return SVC(**hyperparameters, random_state=42)
             else:
-                return SVR(**hyperparameters, random_state=42)
+                return SVR(**hyperparameters)
         
         elif model_name == 'logistic_regression':
             if is_classification:
                 return LogisticRegression(**hyperparameters, random_state=42)
             else:
+                # The space is LogisticRegression's: C maps to alpha = 1 / (2C), the
+                # penalty and solver choices do not apply to Ridge
+                hyperparameters = dict(hyperparameters)
+                if 'C' in hyperparameters:
+                    hyperparameters['alpha'] = 1.0 / (2.0 * hyperparameters.pop('C'))
+                hyperparameters.pop('penalty', None)
+                hyperparameters.pop('solver', None)
                 return Ridge(**hyperparameters, random_state=42)
         
         else:
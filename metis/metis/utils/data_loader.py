@@ -1,19 +1,41 @@
 import pandas as pd
 import numpy as np
-from typing import Tuple, Optional, Dict, Any, Union
+from typing import Tuple, Optional, Dict, Any, Union, List
 import io
 import base64
 from pathlib import Path
 
+from pandas.api.types import union_categoricals
+
 from metis.exceptions import MetisDataError
 
 
-def load_dataset(dataset: Union[str, pd.DataFrame], dataset_format: Optional[str] = None) -> pd.DataFrame:
+# Rows parsed at a time by the streaming loaders
+CHUNK_ROWS = 100_000
+# Rows read up front to infer the compact schema
+SCHEMA_SAMPLE_ROWS = 10_000
+
+
+def load_dataset(dataset: Union[str, pd.DataFrame], dataset_format: Optional[str] = None,
+                 usecols: Optional[List[str]] = None, sample_fraction: Optional[float] = None,
+                 optimize_dtypes: bool = True, chunksize: int = CHUNK_ROWS,
+                 random_state: int = 42) -> pd.DataFrame:
     """Load dataset from file path or return DataFrame if already provided.
     
+    CSV and JSON lines files are streamed in chunks of chunksize rows. With
+    optimize_dtypes, a compact schema is inferred from the first rows (see
+    infer_schema) and every chunk is converted to it as soon as it is
+    parsed, so peak memory stays close to the size of the compact frame.
+    Other JSON files and Parquet files are read whole and then converted.
+    
     Args:
         dataset: File path (str) or pandas DataFrame
-        dataset_format: Optional format hint ('csv', 'json', 'parquet'). Auto-detected if not provided.
+        dataset_format: Optional format hint ('csv', 'json', 'jsonl', 'parquet'). Auto-detected if not provided.
+        usecols: Optional columns to load; the others are never kept in memory
+        sample_fraction: Optional fraction of rows to keep, each row sampled independently
+        optimize_dtypes: Convert columns to the compact schema (default: True)
+        chunksize: Rows parsed at a time for CSV and JSON lines files
+        random_state: Seed of the row sample
     
     Returns:
         Loaded pandas DataFrame
@@ -39,6 +61,8 @@ def load_dataset(dataset: Union[str, pd.DataFrame], dataset_format: Optional[str
             dataset_format = 'csv'
         elif suffix == '.json':
             dataset_format = 'json'
+        elif suffix in ['.jsonl', '.ndjson']:
+            dataset_format = 'jsonl'
         elif suffix in ['.parquet', '.pq']:
             dataset_format = 'parquet'
         else:
@@ -46,22 +70,127 @@ def load_dataset(dataset: Union[str, pd.DataFrame], dataset_format: Optional[str
     
     try:
         if dataset_format == 'csv':
-            df = pd.read_csv(dataset_path)
+            schema = {}
+            if optimize_dtypes:
+                schema = infer_schema(pd.read_csv(dataset_path, usecols=usecols, nrows=SCHEMA_SAMPLE_ROWS))
+            chunks = pd.read_csv(
+                dataset_path, usecols=usecols, chunksize=chunksize,
+                dtype={column: 'category' for column, dtype in schema.items() if dtype == 'category'}
+            )
+        elif dataset_format == 'jsonl':
+            schema = {}
+            if optimize_dtypes:
+                schema = infer_schema(_select_columns(
+                    pd.read_json(dataset_path, lines=True, nrows=SCHEMA_SAMPLE_ROWS), usecols
+                ))
+            chunks = (
+                _select_columns(chunk, usecols)
+                for chunk in pd.read_json(dataset_path, lines=True, chunksize=chunksize)
+            )
         elif dataset_format == 'json':
-            df = pd.read_json(dataset_path)
+            df = _select_columns(pd.read_json(dataset_path), usecols)
+            schema = infer_schema(df) if optimize_dtypes else {}
+            chunks = [df]
         elif dataset_format == 'parquet':
-            df = pd.read_parquet(dataset_path)
+            df = pd.read_parquet(dataset_path, columns=usecols)
+            schema = infer_schema(df) if optimize_dtypes else {}
+            chunks = [df]
         else:
             raise MetisDataError(f"Unsupported dataset format: {dataset_format}")
         
+        df = _assemble_chunks(chunks, schema, sample_fraction, random_state)
+        
         if df.empty:
             raise MetisDataError("Loaded dataset is empty")
         
         return df
     except Exception as e:
+        if isinstance(e, MetisDataError):
+            raise
         raise MetisDataError(f"Failed to load dataset: {str(e)}") from e
 
 
+def infer_schema(sample: pd.DataFrame, max_category_fraction: float = 0.5) -> Dict[str, Any]:
+    """Infer compact dtypes from a sample of a dataset.
+    
+    Floats become float32 and integers the smallest integer type holding
+    the sample's values. Strings become 'category' when at most
+    max_category_fraction of the sample's non-missing values are distinct.
+    Other columns are left out and keep the dtype pandas parses.
+    
+    Returns:
+        Dict of column name to numpy dtype or 'category'
+    """
+    schema = {}
+    for column in sample.columns:
+        values = sample[column]
+        if pd.api.types.is_bool_dtype(values.dtype):
+            continue
+        if pd.api.types.is_float_dtype(values.dtype):
+            schema[column] = np.dtype(np.float32)
+        elif pd.api.types.is_integer_dtype(values.dtype):
+            schema[column] = pd.to_numeric(values, downcast='integer').dtype
+        elif pd.api.types.is_string_dtype(values.dtype) or pd.api.types.is_object_dtype(values.dtype) \
+                or isinstance(values.dtype, pd.CategoricalDtype):
+            if values.nunique() <= max_category_fraction * max(values.count(), 1):
+                schema[column] = 'category'
+    return schema
+
+
+def _select_columns(df: pd.DataFrame, usecols: Optional[List[str]]) -> pd.DataFrame:
+    return df if usecols is None else df[list(usecols)]
+
+
+def _compact_column(values: pd.Series, dtype: Any) -> pd.Series:
+    """Convert a chunk's column to its schema dtype.
+    
+    Integers widen past the schema type if the chunk needs it, and become
+    float32 if the chunk has missing values; columns whose chunk does not
+    parse as the sample did are left as parsed.
+    """
+    if dtype is None:
+        return values
+    if dtype == 'category':
+        return values.astype('category')
+    if pd.api.types.is_bool_dtype(values.dtype) or not pd.api.types.is_numeric_dtype(values.dtype):
+        return values
+    if pd.api.types.is_integer_dtype(dtype) and pd.api.types.is_integer_dtype(values.dtype):
+        return values.astype(np.promote_types(dtype, pd.to_numeric(values, downcast='integer').dtype))
+    return values.astype(np.float32)
+
+
+def _assemble_chunks(chunks, schema: Dict[str, Any], sample_fraction: Optional[float],
+                     random_state: int) -> pd.DataFrame:
+    """Sample and compact chunks as they are parsed, then join them column by column.
+    
+    Each column's pieces are released as soon as that column is joined, so
+    at most one column is held twice.
+    """
+    rng = np.random.default_rng(random_state)
+    pieces: Dict[str, List[pd.Series]] = {}
+    for chunk in chunks:
+        if sample_fraction is not None:
+            chunk = chunk[rng.random(len(chunk)) < sample_fraction]
+        for column in chunk.columns:
+            pieces.setdefault(column, []).append(
+                _compact_column(chunk[column], schema.get(column)).reset_index(drop=True)
+            )
+        del chunk
+    
+    columns = {}
+    for column in list(pieces):
+        column_pieces = pieces.pop(column)
+        if len(column_pieces) > 1 and all(isinstance(piece.dtype, pd.CategoricalDtype) for piece in column_pieces):
+            # Chunks have their own categories; union them instead of falling back to object
+            columns[column] = pd.Series(
+                union_categoricals(column_pieces, sort_categories=True), name=column
+            )
+        else:
+            columns[column] = pd.concat(column_pieces, ignore_index=True)
+        del column_pieces
+    return pd.DataFrame(columns, copy=False)
+
+
 def preprocess_dataset(df: pd.DataFrame, target_column: Optional[str] = None) -> Tuple[pd.DataFrame, Optional[pd.Series]]:
     """Preprocess dataset: handle missing values, encode categorical variables.
     
@@ -94,6 +223,9 @@ def preprocess_dataset(df: pd.DataFrame, target_column: Optional[str] = None) ->
         if X.empty:
             raise MetisDataError("No features remaining after target column removal")
         
+        for col in X.select_dtypes(include=['category']).columns:
+            X[col] = X[col].cat.codes
+        
         X = X.fillna(X.mean(numeric_only=True))
         X = X.fillna('')
         
@@ -125,7 +257,7 @@ def split_data(X: pd.DataFrame, y: pd.Series, test_size: float = 0.2, val_size:
     if len(X) < 10:
         raise MetisDataError("Dataset too small: need at least 10 samples")
     
-    use_stratify = (y.dtype == 'int' or y.dtype == 'object' or y.dtype.name == 'category')
+    use_stratify = (pd.api.types.is_integer_dtype(y.dtype) or y.dtype == 'object' or y.dtype.name == 'category')
     
     if use_stratify:
         value_counts = y.value_counts()
@@ -195,3 +327,84 @@ def split_data(X: pd.DataFrame, y: pd.Series, test_size: float = 0.2, val_size:
     
     return X_train, X_val, X_test, y_train, y_val, y_test, adjustments
 
+
+
+def fidelity_subsets(y_train: pd.Series, min_fraction: float, reduction_factor: int = 3,
+                     min_samples: int = 10) -> List[Tuple[float, Optional[np.ndarray]]]:
+    """Build nested-size stratified row subsets of the training split for multi-fidelity search.
+    
+    Fractions are 1, 1/reduction_factor, 1/reduction_factor**2, ... down to
+    min_fraction, returned smallest first. Rungs that would hold fewer than
+    min_samples rows are dropped.
+    
+    Returns:
+        List of (fraction, row_indices) tuples. row_indices are sorted positional
+        indices into the training split, or None for the full split.
+    
+    Raises:
+        MetisDataError: If the subsets cannot be built
+    """
+    from sklearn.model_selection import train_test_split
+    
+    if not 0 < min_fraction <= 1:
+        raise MetisDataError(f"min_fraction must be in (0, 1], got {min_fraction}")
+    
+    fractions = []
+    fraction = 1.0
+    while fraction >= min_fraction - 1e-12:
+        fractions.append(fraction)
+        fraction /= reduction_factor
+    
+    use_stratify = (pd.api.types.is_integer_dtype(y_train.dtype) or y_train.dtype == 'object' or y_train.dtype.name == 'category')
+    if use_stratify and y_train.value_counts().min() < 2:
+        use_stratify = False
+    
+    positions = np.arange(len(y_train))
+    subsets = [(1.0, None)]
+    for fraction in fractions[1:]:
+        n_rows = int(len(y_train) * fraction)
+        if n_rows < min_samples:
+            break
+        try:
+            rows, _ = train_test_split(
+                positions, train_size=n_rows, random_state=42,
+                stratify=y_train if use_stratify else None
+            )
+        except ValueError:
+            rows, _ = train_test_split(positions, train_size=n_rows, random_state=42)
+        subsets.append((fraction, np.sort(rows)))
+    
+    return subsets[::-1]
+
+
+def cv_fold_indices(y_train: pd.Series, n_folds: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Precompute K-fold splits of the training split as positional index arrays.
+    
+    Folds are stratified when the target looks categorical and every class
+    has at least n_folds rows.
+    
+    Returns:
+        List of (train_indices, validation_indices) tuples of sorted int64 arrays
+    
+    Raises:
+        MetisDataError: If there are fewer rows than folds
+    """
+    from sklearn.model_selection import KFold, StratifiedKFold
+    
+    if len(y_train) < n_folds:
+        raise MetisDataError(f"Cannot build {n_folds} folds from {len(y_train)} training rows")
+    
+    use_stratify = (pd.api.types.is_integer_dtype(y_train.dtype) or y_train.dtype == 'object' or y_train.dtype.name == 'category')
+    if use_stratify and y_train.value_counts().min() < n_folds:
+        use_stratify = False
+    
+    if use_stratify:
+        splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=42)
+    else:
+        splitter = KFold(n_splits=n_folds, shuffle=True, random_state=42)
+    
+    positions = np.zeros(len(y_train))
+    return [
+        (train.astype(np.int64), val.astype(np.int64))
+        for train, val in splitter.split(positions, y_train if use_stratify else None)
+    ]
@@ -0,0 +1,51 @@
+"""Cheap dataset meta-features used to find similar past runs."""
+
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+
+def compute_meta_features(X: pd.DataFrame, y: pd.Series, is_classification: bool,
+                          max_samples: int = 10000) -> Dict[str, float]:
+    """Describe a preprocessed dataset with a few scale-free statistics.
+    
+    Args:
+        X: Preprocessed feature DataFrame (all numeric)
+        y: Target Series
+        is_classification: Whether this is a classification task
+        max_samples: Rows sampled for the distribution statistics
+    
+    Returns:
+        Dictionary of meta-feature name to value
+    """
+    if len(X) > max_samples:
+        sample = X.sample(n=max_samples, random_state=42).index
+        X_sample, y_sample = X.loc[sample], y.loc[sample]
+    else:
+        X_sample, y_sample = X, y
+    
+    values = X_sample.to_numpy(dtype=np.float64)
+    skew = pd.DataFrame(values).skew().abs().replace([np.inf, -np.inf], np.nan).fillna(0)
+    unique_counts = X_sample.nunique()
+    
+    meta = {
+        'log_rows': float(np.log10(len(X))),
+        'log_cols': float(np.log10(X.shape[1])),
+        'mean_abs_skew': float(np.log1p(skew.mean())) if len(skew) else 0.0,
+        'discrete_fraction': float((unique_counts <= 20).mean()),
+    }
+    
+    if is_classification:
+        frequencies = y_sample.value_counts(normalize=True)
+        entropy = -(frequencies * np.log(frequencies)).sum()
+        meta['log_classes'] = float(np.log2(max(len(frequencies), 2)))
+        meta['class_balance'] = float(frequencies.min() / frequencies.max())
+        meta['class_entropy'] = float(entropy / np.log(len(frequencies))) if len(frequencies) > 1 else 0.0
+    else:
+        target = pd.to_numeric(y_sample, errors='coerce').dropna()
+        target_skew = target.skew() if len(target) > 2 else 0.0
+        meta['log_classes'] = 0.0
+        meta['class_balance'] = 1.0
+        meta['class_entropy'] = float(np.log1p(abs(target_skew))) if np.isfinite(target_skew) else 0.0
+    
+    return meta
@@ -0,0 +1,32 @@
+"""Command-line entry point for distributed search workers.
+
+Usage:
+    python -m metis.worker /shared/metis-coordinator [--max-idle-seconds 600] [--threads 8]
+"""
+
+import argparse
+import logging
+
+from metis.core.distributed import run_worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate Metis trials queued in a coordinator directory.")
+    parser.add_argument('path', help="Coordinator directory passed to metis.fit as coordinator_path")
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help="Seconds between checks for new trials when idle (default: 1)")
+    parser.add_argument('--max-idle-seconds', type=float, default=None,
+                        help="Exit after this long without work (default: run forever)")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="Threads per trial for models and BLAS/OpenMP (default: all available CPUs)")
+    parser.add_argument('--pin-cpus', action='store_true',
+                        help="Pin the worker to its CPUs (Linux only)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    run_worker(args.path, poll_interval=args.poll_interval, max_idle_seconds=args.max_idle_seconds,
+               n_threads=args.threads, pin_cpus=args.pin_cpus)
+
+
+if __name__ == '__main__':
+    main()
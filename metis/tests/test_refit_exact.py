@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from metis.core.orchestrator import Orchestrator
+from metis.core.search_space import SearchSpace
+
+
+def make_orchestrator():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 4)), columns=['a', 'b', 'c', 'd'])
+    y = pd.Series(X @ np.array([1.0, -2.0, 0.5, 0.0]) + rng.normal(scale=0.1, size=300))
+    splits = (X[:200], X[200:250], X[250:], y[:200], y[200:250], y[250:])
+    search_space = SearchSpace(list(X.columns), is_classification=False)
+    return Orchestrator(*splits, search_space, metric='r2', objective='maximize',
+                        search_budget=1, use_quantum=False, svm_max_rows=100)
+
+
+def record_best(orchestrator, config):
+    result = orchestrator.evaluator.evaluate_config(config)
+    result['metrics'].pop('validation_predictions', None)
+    orchestrator.best_score = result['score']
+    orchestrator.best_config = config
+    orchestrator.best_model = result['model']
+    orchestrator.best_metrics = result['metrics']
+    orchestrator.leaderboard.add(result['score'], config, result['metrics'], result['model'])
+    return result
+
+
+def test_refit_exact_keeps_better_approximation(monkeypatch):
+    orchestrator = make_orchestrator()
+    config = {'model': 'svm', 'hyperparameters': {'C': 1.0, 'gamma': 'scale', 'kernel': 'linear'},
+              'feature_mask': [True] * 4}
+    approximate = record_best(orchestrator, config)
+    assert approximate['metrics'].get('approximation') == 'linear'
+
+    evaluate_config = orchestrator.evaluator.evaluate_config
+
+    def worse_exact(config, exact=False, **kwargs):
+        result = evaluate_config(config, exact=exact, **kwargs)
+        result['score'] = approximate['score'] - 0.5
+        return result
+
+    monkeypatch.setattr(orchestrator.evaluator, 'evaluate_config', worse_exact)
+    orchestrator._refit_exact()
+
+    assert orchestrator.best_model is approximate['model']
+    assert orchestrator.best_score == approximate['score']
+    assert orchestrator.leaderboard.entries[0]['model'] is approximate['model']
+
+
+def test_refit_exact_replaces_worse_approximation(monkeypatch):
+    orchestrator = make_orchestrator()
+    config = {'model': 'svm', 'hyperparameters': {'C': 1.0, 'gamma': 'scale', 'kernel': 'linear'},
+              'feature_mask': [True] * 4}
+    approximate = record_best(orchestrator, config)
+
+    evaluate_config = orchestrator.evaluator.evaluate_config
+
+    def better_exact(config, exact=False, **kwargs):
+        result = evaluate_config(config, exact=exact, **kwargs)
+        result['score'] = approximate['score'] + 0.5
+        return result
+
+    monkeypatch.setattr(orchestrator.evaluator, 'evaluate_config', better_exact)
+    orchestrator._refit_exact()
+
+    assert orchestrator.best_model is not approximate['model']
+    assert 'approximation' not in orchestrator.best_metrics
+    assert orchestrator.leaderboard.entries[0]['model'] is orchestrator.best_model